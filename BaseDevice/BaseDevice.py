@@ -2,15 +2,29 @@ import os
 import time
 import threading
 import numpy as np
-from queue import Queue
 from typing import List, Tuple, Dict
+from BaseDevice.util.RingBuffer import RingBuffer
+from BaseDevice.util.ChunkWriter import ChunkWriter
+from BaseDevice.util.FrameContainer import FrameContainerWriter
+from BaseDevice.util.PreviewChannel import PreviewChannel
+from BaseDevice.util.SessionClock import SessionClock
+from BaseDevice.util.EncoderPool import EncoderPool, FrameEncoder
 
 class BaseDevice:
     devices : Dict[str, 'BaseDevice'] = {}
-    devices_start_timestamp : Dict[str, float] = {}
     recording : bool = False
-    write_thread : threading.Thread = None
     save_dir : str = None
+    chunk_seconds : float = ChunkWriter.CHUNK_SECONDS  # 录制分块时长
+    chunk_bytes : int = ChunkWriter.CHUNK_BYTES  # 录制分块大小上限
+    memory_budget : int = None  # 单个分块在内存中的字节上限，超出部分溢出到保存目录下的临时文件，None 为不限制
+    frame_container : bool = False  # 帧为变长字节（如JPEG）时使用只追加的帧容器存储
+    preview_interval : float = 1.0  # 设备侧刷新预览通道的间隔（秒）
+    buffer_fields : dict = None  # 随帧录制的附加列，列名 -> dtype
+    encoder : FrameEncoder = None  # 设置后录制时帧先经编码池编码再写入帧容器
+    encoder_workers : int = 2
+    container_codec : str = "mjpeg"  # 不经编码池、直接写入帧容器的帧的编码
+    container_codec_info : dict = None
+    clock : SessionClock = SessionClock()  # 所有设备共用的时间戳时钟
     def __init__(self, device_name, frame_rate = 30):
         self.device_name = device_name
         self.frame_rate = frame_rate
@@ -18,11 +32,14 @@ class BaseDevice:
         self.frame_count = 0
         self.one_frame = None
         self.buffer_size = frame_rate
-        self.buffer = Queue(maxsize=self.buffer_size)
-        self.buffer_len = 90
+        self.buffer = RingBuffer(self.buffer_size)
         self.thread = None
         self.running = False  # 线程运行标志
         self.allow_record = True
+        self.writer : ChunkWriter = None
+        self.preview = PreviewChannel()
+        self.preview_thread = None
+        self.preview_errors = 0  # 准备预览帧失败的次数
         BaseDevice.devices[device_name] = self
 
     def start(self):
@@ -31,12 +48,34 @@ class BaseDevice:
         self.running = True
         self.thread = threading.Thread(target=self._collect_loop, daemon=True)
         self.thread.start()
+        self.preview_thread = threading.Thread(target=self._preview_loop, daemon=True)
+        self.preview_thread.start()
+
+    def _preview_loop(self):
+        """按 preview_interval 把当前帧写入预览通道，GUI 只读取预览通道"""
+        while self.running:
+            try:
+                frame = self.get_current_data()
+                if frame is not None:
+                    self.preview.write(frame)
+            except Exception as e:
+                # 预览失败不影响采集和录制，只打印第一次的错误，之后计数
+                self.preview_errors += 1
+                if self.preview_errors == 1:
+                    print(f"[{self.device_name}] 预览帧获取失败: {e!r}")
+            time.sleep(self.preview_interval)
+
+    def get_preview(self) -> np.ndarray:
+        """返回预览分辨率的 RGB 图像视图，尚无预览时返回 None"""
+        return self.preview.read()
         
     def stop(self):
         """停止采集线程"""
         self.running = False
         if self.thread:
             self.thread.join()
+        if self.preview_errors > 1:
+            print(f"[{self.device_name}] 预览帧获取共失败 {self.preview_errors} 次")
         try:
             self.release()
         except:
@@ -44,16 +83,51 @@ class BaseDevice:
     
     def record(self):
         self.reading_buffer = True
+        self.writer = self.open_writer()
         while BaseDevice.recording:
-            try:
-                frame, timestamp = self.buffer.get(timeout=1)
-                self.data[self.frame_count] = frame
-                self.timestamps.append(timestamp)
-                self.frame_count += 1
-            except:
+            batch = self.buffer.get_batch(timeout=1)
+            if batch is None:
                 continue
+            frames, timestamps, fields = batch
+            self.writer.extend(frames, timestamps, **fields)
+            self.frame_count += len(timestamps)
         self.reading_buffer = False
 
+    def open_writer(self, name=None, encoder=None, one_frame=None):
+        """
+        创建本次录制的写入器，数据边录边写入 save_floder/name。
+        name/encoder/one_frame 默认取本设备的，多路数据流的设备可按流分别创建。
+        """
+        name = name or self.device_name
+        encoder = encoder or self.encoder
+        one_frame = self.one_frame if one_frame is None else one_frame
+        folder = os.path.join(BaseDevice.save_floder, name)
+        meta_info = self.record_meta_info()
+        extra_fields = list((self.buffer_fields or {}).items())
+        if encoder is not None:
+            writer = FrameContainerWriter(folder, name, self.frame_rate, meta_info=meta_info,
+                                          extra_fields=extra_fields + encoder.fields, codec=encoder.codec,
+                                          codec_info=encoder.codec_info(one_frame))
+            return EncoderPool(writer, encoder, workers=self.encoder_workers)
+        if self.frame_container:
+            return FrameContainerWriter(folder, name, self.frame_rate, meta_info=meta_info,
+                                        extra_fields=extra_fields, codec=self.container_codec,
+                                        codec_info=self.container_codec_info)
+        return ChunkWriter(folder, name, self.frame_rate, meta_info=meta_info,
+                           chunk_seconds=self.chunk_seconds, chunk_bytes=self.chunk_bytes,
+                           memory_budget=self.memory_budget)
+
+    def record_meta_info(self) -> dict:
+        """写入录制文件的元数据：用户信息加上会话时钟锚点"""
+        meta_info = dict(BaseDevice.meta_data or {})
+        meta_info["clock"] = BaseDevice.clock.state()
+        return meta_info
+
+    @classmethod
+    def worker_kwargs(cls, kwargs):
+        """多进程模式下传给子进程的构造参数，必须在主进程中确定的参数在此处理"""
+        return kwargs
+
     @staticmethod
     def start_devices():
         for device in BaseDevice.devices.values():
@@ -62,19 +136,12 @@ class BaseDevice:
     @staticmethod
     def start_record(record_duration : float = 5):
         """开始保存数据"""
-        for device in BaseDevice.devices.values():
-            if not device.allow_record:
-                continue
-            device.ini_data_buffer()
-            print(f"[{device.device_name}] 开始录制...")
+        devices = [device for device in BaseDevice.devices.values() if device.allow_record]
+        for device in devices:
+            device.prepare_record()
         BaseDevice.recording = True
-        for device in BaseDevice.devices.values():
-            if not device.allow_record:
-                continue
-            threading.Thread(target=lambda: device.record(), daemon=True).start()
-        # time.sleep(2)
-        # BaseDevice.write_thread = threading.Thread(target=BaseDevice.save_data_block, args=(record_duration,), daemon=True)
-        # BaseDevice.write_thread.start()
+        for device in devices:
+            threading.Thread(target=device.record, daemon=True).start()
 
     @staticmethod
     def stop_record():
@@ -82,13 +149,16 @@ class BaseDevice:
         BaseDevice.recording = False
         for device in BaseDevice.devices.values():
             if device.allow_record:
-                print(f"[{device.device_name}] 停止录制...")
+                device.report_record_stop()
 
-    @staticmethod
-    def get_latest_start_timestamp():
-        all_start_timestamp = [BaseDevice.devices_start_timestamp[device_name] for device_name in BaseDevice.devices.keys()]
-        latest_start_timestamp = max(all_start_timestamp)
-        return latest_start_timestamp
+    def prepare_record(self):
+        """录制开始前重置本设备的计数和缓冲区"""
+        self.ini_data_buffer()
+        self.buffer = self.create_buffer()
+        print(f"[{self.device_name}] 开始录制...")
+
+    def report_record_stop(self):
+        print(f"[{self.device_name}] 停止录制... 缓冲区满丢弃{self.buffer.overflow}帧")
 
     @staticmethod
     def register_user_meta_data(save_dir,meta_data):
@@ -113,104 +183,48 @@ class BaseDevice:
         for device in BaseDevice.devices.values():
             device.stop()
 
-    def save_data_block(duration):
-        latest_start_timestamp = BaseDevice.get_latest_start_timestamp()
-        while True:
-            if time.time() - latest_start_timestamp < duration:
-                continue
-            else:
-                end_timestamp = time.time()
-                for device in BaseDevice.devices.values():
-                    print(device.device_name)
-                    device.save_data(latest_start_timestamp, end_timestamp)
-                BaseDevice.devices_start_timestamp = {}
-                time.sleep(2)
-                latest_start_timestamp = BaseDevice.get_latest_start_timestamp()
-
-    def save_data(self, start_timestamp = None , end_timestamp = None):
-        if start_timestamp is None:
-            threading.Thread(target=lambda: self._save_data_all(), daemon=True).start()
-        else:
-            threading.Thread(target=lambda: self._save_data(start_timestamp,end_timestamp), daemon=True).start()
-
-    def _save_data(self, start_timestamp = None, end_timestamp = None):
-
-        start = time.time()
-        if not self.data:
-            print(f"[{self.device_name}] 无数据保存")
-            return
-        print(BaseDevice.save_floder)
-        print(BaseDevice.save_dir)
-        folder = os.path.join(BaseDevice.save_floder,self.device_name)
-        folder = os.path.join(BaseDevice.save_dir, folder)
-        os.makedirs(folder, exist_ok=True)
-
-        data_array = np.stack(self.data)
-        # 找到最近的起始时间戳
-        if start_timestamp is None:
-            start_index = 0
-            end_index = len(data_array)
-        else:
-            start_index = np.searchsorted(self.timestamps, start_timestamp)
-            end_index = np.searchsorted(self.timestamps, end_timestamp)
-        data_array = data_array[start_index:end_index]
-        self.ini_data_buffer(end_index)
-        filename = os.path.join(folder, f"{start_timestamp}f{self.frame_rate}c{end_index-start_index}.npz")
-        # 保存多个变量
-        np.savez_compressed(
-            filename,
-            frames=data_array,
-        )
-        print(f"[{self.device_name}] 数据保存到 {filename}, 帧长度为{len(data_array)}，整体耗时：{time.time() - start:.4f}s")
+    def save_data(self):
+        threading.Thread(target=self._save_data_all, daemon=True).start()
 
     def _save_data_all(self):
         while self.reading_buffer:
             time.sleep(0.1)
-        if self.data is None:
+        if self.writer is None:
             print(f"[{self.device_name}] 无数据保存")
             return
-        folder = os.path.join(BaseDevice.save_floder,self.device_name)
-        os.makedirs(folder, exist_ok=True)
         start = time.time()
-        l = len(self.timestamps)
-        filename = os.path.join(folder, f"{self.timestamps[0]}f{self.frame_rate}c{l}.npz")
-
-        # 保存多个变量
-        np.savez(
-            filename,
-            device_name=self.device_name,
-            frame_rate=self.frame_rate,
-            timestamps=np.array(self.timestamps,dtype=np.float64),
-            frames=self.data[:l],
-            meta_info=BaseDevice.meta_data
-        )
-        print(f"[{self.device_name}] 数据保存到 {filename}, 帧长度为{l}，整体耗时：{time.time() - start:.4f}s")
-        del self.data
-        del self.timestamps
+        # 数据已在录制过程中分块落盘，这里只需写出最后一个分块
+        self.writer.close()
+        print(f"[{self.device_name}] 数据保存到 {self.writer.folder}, 共{len(self.writer.files)}个分块，帧长度为{self.writer.frame_count}，收尾耗时：{time.time() - start:.4f}s")
         self.ini_data_buffer()
 
-    def register_start_timestamp(self,timestamp):
-        if self.device_name not in BaseDevice.devices_start_timestamp.keys():
-            BaseDevice.devices_start_timestamp[self.device_name] = timestamp
-        return 
-    
-    def ini_data_buffer(self, index = None):
+    def ini_data_buffer(self):
+        """重置录制计数和写入器"""
         self.frame_count = 0
-        self.frame_size = self.one_frame.shape
-        self.frame_dtype = self.one_frame.dtype
-        if index:
-            if len(self.data) > index+1:
-                self.data = self.data[index+1:]
-                self.timestamps = self.timestamps[index+1:]
-                return
-        self.data = np.zeros((self.frame_rate*self.buffer_len, *self.frame_size), dtype=self.frame_dtype)
-        self.timestamps = []
-        
-    def put_data_to_buffer(self, data_tuple):
-        if self.buffer.qsize() == self.buffer.maxsize:
-            print(f"[{self.device_name}] buffer is full, drop one frame")
-            self.buffer.get()
-        self.buffer.put(data_tuple)
+        self.writer = None
+
+    def create_buffer(self, one_frame=None) -> RingBuffer:
+        """按帧率和单帧形状预分配环形缓冲，帧形状未知（变长帧）时存引用"""
+        one_frame = self.one_frame if one_frame is None else one_frame
+        if one_frame is None:
+            return RingBuffer(self.buffer_size, fields=self.buffer_fields)
+        return RingBuffer(self.buffer_size, one_frame.shape, one_frame.dtype, fields=self.buffer_fields)
+
+    def typed_buffer(self) -> RingBuffer:
+        """
+        录制开始时还没收到第一帧的设备（PPG/UWB 等 one_frame 为 None）只能先建 object 缓冲，
+        收到第一帧后在第一次写入时按帧形状重建；此前缓冲中没有数据，record 线程每次都读 self.buffer，直接替换即可。
+        """
+        if self.buffer.shape is None and self.one_frame is not None:
+            self.buffer = self.create_buffer()
+        return self.buffer
+
+    def put_data_to_buffer(self, data_tuple, **fields):
+        frame, timestamp = data_tuple
+        self.typed_buffer().put(frame, timestamp, **fields)
+
+    def put_batch_to_buffer(self, frames, timestamps, **fields):
+        self.typed_buffer().put_batch(frames, timestamps, **fields)
 
     def set_save_dir(self, save_dir):
         self.save_dir = save_dir
@@ -5,10 +5,28 @@ import time
 import av
 import os
 import numpy as np
+import cv2
 from BaseDevice.BaseDevice import BaseDevice
+from BaseDevice.util.MjpegSplitter import MjpegSplitter
+from BaseDevice.util.PreviewChannel import PreviewChannel
 av.logging.set_level(av.logging.ERROR)
 class FFmpegDevice(BaseDevice):
     logit_c920_id = 1
+    frame_container = True
+    # 预览解码缩放倍数 -> libjpeg 在 DCT 域直接缩小解码的标志
+    PREVIEW_DECODE_FLAGS = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }
+    # 实时压缩模式：ffmpeg 编码器及低延迟参数（无 B 帧，固定 GOP，每个关键帧前重复 SPS/PPS，可从任一关键帧解码）
+    LIVE_CODECS = {
+        "h264": ["-c:v", "libx264", "-tune", "zerolatency", "-bf", "0"],
+        "hevc": ["-c:v", "libx265", "-tune", "zerolatency"],
+    }
+    COPY_ERROR_HINT = 30  # 直通模式下预览解码失败达到该次数时提示改用重新编码
+
     def __init__(self, **kwargs):
         device_name = kwargs.get('device_name')
         camera_name = kwargs.get('camera_name')
@@ -16,11 +34,21 @@ class FFmpegDevice(BaseDevice):
         frame_rate = kwargs.get('frame_rate')
         encode_type = kwargs.get("encode_type", "mjpeg")
         quality = kwargs.get("quality", 10)
+        preview_scale = kwargs.get("preview_scale")  # 默认按预览通道尺寸自动选择
+        # output_codec: copy 为原样转发摄像头的 MJPEG 数据包（不解码不重新编码），
+        # mjpeg 为重新编码为 MJPEG（-q:v quality，摄像头原生流不适用时使用），h264/hevc 为实时压缩，按数据包保存
+        output_codec = kwargs.get("output_codec", "copy")
+        preset = kwargs.get("preset", "veryfast")
+        crf = kwargs.get("crf", 23)
+        gop = kwargs.get("gop")  # 关键帧间隔（帧），默认 1 秒
         super().__init__(device_name=device_name,frame_rate=frame_rate)
         self.camera_name = camera_name
         if self.camera_name == "HD Pro Webcam C920":
-            self.camera_name_ = kwargs.get(f"ID{FFmpegDevice.logit_c920_id}")
-            FFmpegDevice.logit_c920_id += 1
+            c920_id = kwargs.get("c920_id")
+            if c920_id is None:
+                c920_id = FFmpegDevice.logit_c920_id
+                FFmpegDevice.logit_c920_id += 1
+            self.camera_name_ = kwargs.get(f"ID{c920_id}")
         else:
             self.camera_name_ = self.camera_name
         self.camera_name_ = f'video={self.camera_name_}'
@@ -30,35 +58,88 @@ class FFmpegDevice(BaseDevice):
         self.current = None
         self.running = True
         self.decode_stream = None
-        self.n_frames = []
         h,w,c = self.frame_size
-        self.codec = av.codec.CodecContext.create(self.encode_type, 'r')
-        self.option_list = [
+        if output_codec not in ("copy", "mjpeg") and output_codec not in FFmpegDevice.LIVE_CODECS:
+            raise ValueError(f"不支持的输出编码: {output_codec}")
+        self.output_codec = output_codec
+        self.live = output_codec in FFmpegDevice.LIVE_CODECS
+        # 实时压缩模式下预览需逐包解码，MJPEG 预览由 decode_preview 用 OpenCV 解码
+        self.codec = av.codec.CodecContext.create(output_codec, 'r') if self.live else None
+        input_options = [
             'ffmpeg',
             '-f', 'dshow',
             '-video_size', f'{w}x{h}',
             '-framerate', f'{self.frame_rate}',
             '-vcodec', 'mjpeg',
             '-i', self.camera_name_,
-            '-f', 'mjpeg',
-            '-q:v', f'{quality}',
-            '-'
         ]
+        if self.live:
+            gop = gop or self.frame_rate
+            codec_options = list(FFmpegDevice.LIVE_CODECS[output_codec])
+            if output_codec == "hevc":
+                codec_options += ['-x265-params', f'keyint={gop}:min-keyint={gop}:bframes=0:repeat-headers=1']
+            self.option_list = input_options + codec_options + [
+                '-preset', preset,
+                '-crf', f'{crf}',
+                '-g', f'{gop}',
+                '-keyint_min', f'{gop}',
+                '-sc_threshold', '0',
+                '-pix_fmt', 'yuv420p',
+                '-bsf:v', 'dump_extra',
+                '-f', 'nut',
+                '-'
+            ]
+            # 数据包按 pts/关键帧标记写入帧容器索引，缓冲留够几个 GOP
+            self.buffer_fields = {"pts": np.int64, "keyframe": np.uint8}
+            self.buffer_size = gop * 4
+            self.container_codec = output_codec
+        elif output_codec == "copy":
+            self.option_list = input_options + [
+                '-c:v', 'copy',
+                '-f', 'mjpeg',
+                '-'
+            ]
+        else:
+            self.option_list = input_options + [
+                '-f', 'mjpeg',
+                '-q:v', f'{quality}',
+                '-'
+            ]
+        self.wait_keyframe = True  # 录制从关键帧开始，缓冲满丢包后也要等到下一个关键帧
+        self.live_frame = None  # 实时压缩模式下最近解码的一帧（预览用）
+        self.live_stats = {"packets": 0, "bytes": 0, "skipped": 0}
         self.frame_buffer = queue.Queue(maxsize=1)
+        self.splitter = None
+        self.preview_scale = preview_scale or FFmpegDevice.auto_preview_scale(w, h)
+        self.preview_flag = FFmpegDevice.PREVIEW_DECODE_FLAGS[self.preview_scale]
+        self.preview_src = None  # 上次预览解码对应的帧，帧未变化时直接复用结果
+        self.preview_img = None
+        self.decode_errors = 0
 
-    def decode(self, frame_bty):
-        try:
-            packet = av.packet.Packet(frame_bty)
-            frames = self.codec.decode(packet)
-            if frames:
-                frame = frames[0]
-                img = frame.to_ndarray(format='bgr24')
-                return img
-            else:
-                return None
-        except Exception as e:
-            print(f"Decode error: {e}")
-            return None
+    @staticmethod
+    def auto_preview_scale(w, h) -> int:
+        """缩小解码后仍不小于预览通道显示尺寸的最大倍数，由预览通道再用 INTER_AREA 缩小，不放大"""
+        fit = min(PreviewChannel.WIDTH / w, PreviewChannel.HEIGHT / h)
+        return max(scale for scale in FFmpegDevice.PREVIEW_DECODE_FLAGS
+                   if scale == 1 or (w // scale >= w * fit and h // scale >= h * fit))
+
+    @classmethod
+    def worker_kwargs(cls, kwargs):
+        # 多台 C920 的编号需在主进程中分配，子进程中计数器各自从1开始
+        if kwargs.get("camera_name") == "HD Pro Webcam C920" and "c920_id" not in kwargs:
+            kwargs = dict(kwargs, c920_id=FFmpegDevice.logit_c920_id)
+            FFmpegDevice.logit_c920_id += 1
+        return kwargs
+
+    def decode_preview(self, frame_bty):
+        """按 preview_scale 在 DCT 域缩小解码，只用于预览"""
+        img = cv2.imdecode(np.frombuffer(frame_bty, dtype=np.uint8), self.preview_flag)
+        if img is None:
+            self.decode_errors += 1
+            if self.output_codec == "copy" and self.decode_errors == self.COPY_ERROR_HINT:
+                print(f"[{self.device_name}] 原生 MJPEG 流解码失败 {self.decode_errors} 次，"
+                      f"可在 camera_params 中把该摄像头的 output_codec 改为 mjpeg 重新编码")
+        return img
     
     def reader(self,pipe,btys_queue):
         while self.running:
@@ -74,7 +155,7 @@ class FFmpegDevice(BaseDevice):
                 break
 
     def start_ffmpeg(self, option_list):
-        self.bty_buffer = b''
+        self.splitter = MjpegSplitter()
         btys_queue = queue.Queue()
         self.process = subprocess.Popen(option_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE,bufsize=10**8)
         threading.Thread(target=self.reader, args=(self.process.stdout, btys_queue), daemon=True).start()
@@ -87,23 +168,69 @@ class FFmpegDevice(BaseDevice):
                     break
                 else:
                     continue
-            self.bty_buffer += chunk
-            
-            while True:
-                start_marker = self.bty_buffer.find(b'\xff\xd8')
-                end_marker = self.bty_buffer.find(b'\xff\xd9')
-                if start_marker != -1 and end_marker != -1 and start_marker < end_marker:
-                    frame_data = self.bty_buffer[start_marker:end_marker + 2]
-                    timestamp = time.time()
-                    self.bty_buffer = self.bty_buffer[end_marker + 2:]
-                    if self.frame_buffer.full():
-                        self.frame_buffer.get()
-                    self.frame_buffer.put((frame_data, timestamp))
-                else:
+            for frame_data in self.splitter.feed(chunk):
+                timestamp = self.clock.now(self.device_name)
+                if self.frame_buffer.full():
+                    self.frame_buffer.get()
+                self.frame_buffer.put((frame_data, timestamp))
+
+    def start_live(self, option_list):
+        """实时压缩模式：ffmpeg 输出 NUT 流，PyAV 解复用得到带 pts/关键帧标记的数据包"""
+        # 无缓冲管道：PyAV 每次读取拿到已到达的数据就返回，数据包逐个到达，时间戳不会按整块堆积
+        self.process = subprocess.Popen(option_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        threading.Thread(target=self.stderr_reader, args=(self.process.stderr,), daemon=True).start()
+        container = av.open(self.process.stdout, format="nut")
+        stream = container.streams.video[0]
+        extradata = stream.codec_context.extradata
+        if extradata:
+            self.codec.extradata = extradata
+        self.container_codec_info = {
+            "time_base": [stream.time_base.numerator, stream.time_base.denominator],
+            "width": stream.codec_context.width,
+            "height": stream.codec_context.height,
+            "extradata": extradata.hex() if extradata else None,  # SPS/PPS，关键帧内也重复携带
+        }
+        start = time.time()
+        cnt = 0
+        try:
+            for packet in container.demux(stream):
+                if not self.running:
                     break
-    
+                if packet.size == 0:
+                    continue
+                timestamp = self.clock.now(self.device_name)
+                data = bytes(packet)
+                keyframe = packet.is_keyframe
+                self.live_stats["packets"] += 1
+                self.live_stats["bytes"] += len(data)
+                self.decode_live(packet)
+                cnt += 1
+                if self.show_fps and time.time() - start > 1:
+                    print(f"device:{self.device_name},FPS: {cnt}, 码率: {self.live_stats['bytes'] * 8 / 1e6 / max(time.time() - start, 1e-6):.1f}Mbps, 解码失败: {self.decode_errors}")
+                    self.live_stats["bytes"] = 0
+                    start = time.time()
+                    cnt = 0
+                if BaseDevice.recording and self.allow_record:
+                    if self.wait_keyframe and not keyframe:
+                        self.live_stats["skipped"] += 1
+                        continue
+                    self.wait_keyframe = not self.buffer.put(data, timestamp, pts=packet.pts, keyframe=keyframe)
+        finally:
+            container.close()
+
+    def decode_live(self, packet):
+        """预览解码：P 帧依赖前面的帧，每个数据包都要送进解码器，只在预览时才转换为图像"""
+        try:
+            frames = self.codec.decode(packet)
+            if frames:
+                self.live_frame = frames[-1]
+        except Exception:
+            self.decode_errors += 1
 
     def _collect_loop(self):
+        if self.live:
+            self.start_live(self.option_list)
+            return
         threading.Thread(target=self.start_ffmpeg, args=(self.option_list,)).start()
         start = time.time()
         cnt = 0
@@ -114,84 +241,43 @@ class FFmpegDevice(BaseDevice):
                 self.current = frame_bty
                 cnt += 1
                 if self.show_fps and time.time() - start > 1:
-                    print(f"device:{self.device_name},FPS: {cnt}")
+                    print(f"device:{self.device_name},FPS: {cnt}, 分帧FPS: {self.splitter.fps:.1f}, 解码失败: {self.decode_errors}")
                     start = time.time()
                     cnt = 0
-                if not BaseDevice.recording:
-                    self.n_frames.append(frame_bty)
-                    if len(self.n_frames) > self.frame_rate:
-                        self.n_frames.pop(0)
                 if BaseDevice.recording and self.allow_record:
                     self.put_data_to_buffer((frame_bty, timestamp))
             except queue.Empty:
                 pass
-    
-    def get_size(self):
-        size = 0
-        for frame in self.n_frames:
-            size_ = len(frame)
-            if size_ > size:
-                size = size_
-        return size
-    
-    def record(self):
-        self.reading_buffer = True
-        while BaseDevice.recording:
-            try:
-                frame_bytes, timestamp = self.buffer.get(timeout=1)
-                frame_len = len(frame_bytes)
-                frame_pad = frame_bytes.ljust(self.frame_max_size, b'\x00')
-                self.data.append(frame_pad)
-                self.frame_lens.append(frame_len)
-                self.timestamps.append(timestamp)
-                self.frame_count += 1
-            except:
-                continue
-        self.reading_buffer = False
-    
-    def _save_data_all(self):
-        while self.reading_buffer:
-            time.sleep(0.1)
-        if self.data is None:
-            print(f"[{self.device_name}] 无数据保存")
-            return
-        folder = os.path.join(BaseDevice.save_floder,self.device_name)
-        os.makedirs(folder, exist_ok=True)
-        start = time.time()
-        l = len(self.timestamps)
-        filename = os.path.join(folder, f"{self.timestamps[0]}f{self.frame_rate}c{l}.npz")
 
-        if self.camera_name == "video=HD Pro Webcam C920":
-            for i in range(10):
-                print(len(self.data[i]),self.frame_lens[i])
-        # 保存多个变量
-        np.savez(
-            filename,
-            device_name=self.device_name,
-            frame_rate=self.frame_rate,
-            timestamps=np.array(self.timestamps,dtype=np.float64),
-            frames=self.data,
-            frame_lens = self.frame_lens,
-            meta_info=BaseDevice.meta_data
-        )
-        print(f"[{self.device_name}] 数据保存到 {filename}, 帧长度为{l}，整体耗时：{time.time() - start:.4f}s")
-        del self.data
-        del self.timestamps
-        self.ini_data_buffer()
-    
-    def ini_data_buffer(self, index=None):
+    def ini_data_buffer(self):
         self.frame_count = 0
-        self.frame_size= self.get_size()
-        self.frame_max_size = int(self.frame_size*2)
-        self.data = []
-        self.timestamps = []
-        self.frame_lens = []
+        self.writer = None
+        self.wait_keyframe = True
+        if self.live and self.live_stats["skipped"]:
+            print(f"[{self.device_name}] 等待关键帧跳过 {self.live_stats['skipped']} 个数据包")
+        self.live_stats["skipped"] = 0
 
     def get_current_data(self):
-        if self.current is None:
+        if self.live:
+            return self.live_preview()
+        current = self.current
+        if current is None:
+            return None
+        if current is not self.preview_src:
+            self.preview_img = self.decode_preview(current)
+            self.preview_src = current
+        return self.preview_img
+
+    def live_preview(self):
+        frame = self.live_frame
+        if frame is None:
             return None
-        frame = self.decode(self.current)
-        return frame
+        if frame is not self.preview_src:
+            scale = self.preview_scale
+            self.preview_img = frame.reformat(width=frame.width // scale, height=frame.height // scale,
+                                              format='bgr24').to_ndarray()
+            self.preview_src = frame
+        return self.preview_img
 
     def release(self):
         self.process.terminate()
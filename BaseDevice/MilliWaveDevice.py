@@ -41,7 +41,7 @@ class MilliWaveDevice(BaseDevice):
         while self.running:
             try:
                 frame = self.collector.getData()
-                timestamp = time.time()
+                timestamp = self.clock.now(self.device_name)
                 if frame is None or len(frame) < 10:
                     continue
                 if self.one_frame is None:
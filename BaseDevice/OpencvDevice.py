@@ -1,12 +1,13 @@
 import cv2
 import numpy as np
 import time
-import os
 from pygrabber.dshow_graph import FilterGraph
 from BaseDevice.BaseDevice import BaseDevice
+from BaseDevice.util.EncoderPool import JpegEncoder
 
 class OpencvDevice(BaseDevice):
-    
+    frame_container = True
+
     def __init__(self, **kwargs):
         device_name = kwargs.get("device_name")
         camera_name = kwargs.get("camera_name")
@@ -22,8 +23,10 @@ class OpencvDevice(BaseDevice):
         self.camera_name = camera_name
         self.exposure = exposure
         self.quality = quality
+        # 录制时 JPEG 编码在后台线程池中并行进行（cv2 编码释放 GIL），按帧顺序写入帧容器
+        self.encoder = JpegEncoder(quality)
+        self.encoder_workers = kwargs.get("encoder_workers", 4)
         self.h,self.w,self.c = self.frame_size
-        self.n_frames = []
         self.current = None
         graph = FilterGraph()
         camera_list = graph.get_input_devices()
@@ -46,30 +49,22 @@ class OpencvDevice(BaseDevice):
         cnt = 0
         while self.running:
             ret, frame = self.cap.read()
-            timestamp = time.time()
+            timestamp = self.clock.now(self.device_name)
             if not ret or frame is None:
                 continue
             
-            if not (BaseDevice.recording and self.allow_record):
-                self.n_frames.append(self.encode(frame))
-                if len(self.n_frames) > 10:
-                    self.n_frames.pop(0)
-            self.current = np.array(frame)
+            self.current = frame
             if BaseDevice.recording and self.allow_record:
                 cnt += 1
                 if time.time() - start > 1:
-                    print(f"fps: {cnt}")
+                    writer = self.writer
+                    depth = writer.pending.qsize() if writer is not None else 0
+                    print(f"[{self.device_name}] fps: {cnt}，缓冲{len(self.buffer)}帧，编码队列{depth}，缓冲区满丢弃{self.buffer.overflow}帧")
                     start = time.time()
                     cnt = 0
                 self.put_data_to_buffer((frame, timestamp))
 
 
-    def encode(self, frame):
-        if frame is None:
-            return None
-        else:
-            return cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1]
-        
     def get_current_data(self):
         if self.current is None:
             return np.zeros((self.h, self.w), dtype=np.uint8)
@@ -79,65 +74,3 @@ class OpencvDevice(BaseDevice):
     def release(self):
         self.cap.release()
         return 
-    
-    def ini_data_buffer(self, index=None):
-        self.frame_count = 0
-        self.frame_dtype, self.frame_size= self.get_type_and_data()
-        self.frame_max_size = int(self.frame_size*1.5)
-        self.data = np.zeros((self.frame_rate*self.buffer_len, self.frame_max_size), dtype=self.frame_dtype)
-        self.timestamps = []
-        self.frame_lens = []
-
-    def get_type_and_data(self):
-        dtype = self.n_frames[0].dtype
-        size = 0
-        for frame in self.n_frames:
-            size_ = len(frame)
-            if size_ > size:
-                size = size_
-        return dtype, size
-    
-    def record(self):
-        self.reading_buffer = True
-        while BaseDevice.recording:
-            try:
-                frame, timestamp = self.buffer.get(timeout=1)
-                
-                frame_bytes = self.encode(frame)
-                frame_len = len(frame_bytes)
-                self.data[self.frame_count, :frame_len] = frame_bytes
-                self.frame_lens.append(frame_len)
-                self.timestamps.append(timestamp)
-                self.frame_count += 1
-            except Exception as e:
-                print(f'{e}')
-                continue
-        self.reading_buffer = False
-
-    def _save_data_all(self):
-        while self.reading_buffer:
-            time.sleep(0.1)
-        if self.data is None:
-            print(f"[{self.device_name}] 无数据保存")
-            return
-        folder = os.path.join(BaseDevice.save_floder,self.device_name)
-        os.makedirs(folder, exist_ok=True)
-        start = time.time()
-        print(f"[{self.device_name}]转换数据格式耗时：{time.time() - start:.4f}s")
-        l = len(self.timestamps)
-        filename = os.path.join(folder, f"{self.timestamps[0]}f{self.frame_rate}c{l}.npz")
-
-        # 保存多个变量
-        np.savez(
-            filename,
-            device_name=self.device_name,
-            frame_rate=self.frame_rate,
-            timestamp=self.timestamps,
-            frames=self.data[:l],
-            frame_lens = self.frame_lens,
-            meta_info=BaseDevice.meta_data
-        )
-        print(f"[{self.device_name}] 数据保存到 {filename}, 帧长度为{l}，整体耗时：{time.time() - start:.4f}s")
-        del self.data
-        del self.timestamps
-        self.ini_data_buffer()
\ No newline at end of file
@@ -3,65 +3,230 @@ import cv2
 import numpy as np
 from openni import openni2
 from BaseDevice.BaseDevice import BaseDevice
+from BaseDevice.util.DepthCodec import DepthCodec
+from BaseDevice.util.EncoderPool import JpegEncoder
+from BaseDevice.util.RingBuffer import RingBuffer
 
 
 class OrbbecDevice(BaseDevice):
+    """
+    一个 Orbbec 设备同时采集 depth / ir / color 多路数据流（streams 指定，兼容旧的单路 frame_type）。
+    只枚举一次设备，同时开启的 depth 与 color 使用 OpenNI2 帧同步，registration=True 时深度配准到彩色。
+    每路数据流有各自的环形缓冲、时间戳和写入器（多路时保存到 save_floder/<device_name>_<stream>），
+    所有流的帧都记录设备帧号 frame_index 和设备时间戳 device_timestamp，用于跨流对齐。
+    """
+    STREAMS = ("depth", "ir", "color")
+    buffer_fields = {"frame_index": np.uint32, "device_timestamp": np.uint64}
+
     def __init__(self, **kwargs):
         device_name = kwargs.get("device_name")
         frame_rate = kwargs.get("frame_rate")
         meta_info = kwargs.get("meta_info")
         frame_type = kwargs.get("frame_type")
+        streams = kwargs.get("streams") or [frame_type or "depth"]
+        depth_codec = kwargs.get("depth_codec", "png")  # None 时 depth/ir 按原始数组分块保存
+        depth_delta = kwargs.get("depth_delta", False)
         super().__init__(device_name,frame_rate=frame_rate)
         self.frame_rate = frame_rate
         self.meta_info = meta_info if meta_info else {}
         self.frame_interval = 1.0 / frame_rate
         self.running = True
-        self.current = None
-        self.frame_type = frame_type
+        for stream in streams:
+            if stream not in self.STREAMS:
+                raise ValueError(f"不支持的数据流: {stream}")
+        self.streams = list(streams)
+        self.registration = kwargs.get("registration", True)
+        self.encoder_workers = kwargs.get("encoder_workers", 2)
+        # 每路流各自的编码器（差分编码有帧间状态，不能共用）
+        self.encoders = {}
+        for stream in self.streams:
+            if stream == "color":
+                self.encoders[stream] = JpegEncoder(kwargs.get("color_quality", 90), rgb=True)
+            elif depth_codec:
+                # 录制时在后台编码池中逐帧无损压缩，写入帧容器
+                self.encoders[stream] = DepthCodec(depth_codec, delta=depth_delta)
+        self.open_streams = []  # 实际开启成功的流，与 frame_streams 一一对应
+        self.frame_streams = []
+        self.dev = None
+        self.current = {}  # 流名 -> (OpenNI 帧, 帧缓冲视图)
+        self.one_frames = {}
+        self.buffers = {}
+        self.writers = {}
 
-    def _collect_loop(self):
+    def stream_name(self, stream):
+        """数据流的保存目录名"""
+        return self.device_name if len(self.streams) == 1 else f"{self.device_name}_{stream}"
+
+    def _open_streams(self):
+        """
+        逐路开启数据流，开启失败的流打印原因后跳过（部分 Astra 型号不能同时采集 depth 和 ir），
+        其余的流照常采集；返回是否至少开启了一路。
+        """
         openni2.initialize()
         self.dev = openni2.Device.open_any()
-        if self.frame_type == "depth":
-            self.frame_stream = self.dev.create_depth_stream()
-        elif self.frame_type == "ir":
-            self.frame_stream = self.dev.create_ir_stream()
+        create = {
+            "depth": self.dev.create_depth_stream,
+            "ir": self.dev.create_ir_stream,
+            "color": self.dev.create_color_stream,
+        }
+        created = []
+        for stream in self.streams:
+            try:
+                created.append((stream, create[stream]()))
+            except Exception as e:
+                print(f"[{self.device_name}] 无法创建 {stream} 数据流，已跳过: {e}")
+        names = [stream for stream, _ in created]
+        if "depth" in names and "color" in names:
+            self.dev.set_depth_color_sync_enabled(True)
+            if self.registration:
+                self.dev.set_image_registration_mode(openni2.IMAGE_REGISTRATION_DEPTH_TO_COLOR)
+        for stream, frame_stream in created:
+            try:
+                frame_stream.start()
+            except Exception as e:
+                print(f"[{self.device_name}] 无法开启 {stream} 数据流，已跳过"
+                      f"（该型号可能不支持与 {'/'.join(n for n in names if n != stream)} 同时采集）: {e}")
+                continue
+            self.open_streams.append(stream)
+            self.frame_streams.append(frame_stream)
+        return bool(self.frame_streams)
 
-        self.frame_stream.start()
-        
+    def _collect_loop(self):
+        try:
+            opened = self._open_streams()
+        except Exception as e:
+            print(f"[{self.device_name}] 打开 Orbbec 设备失败: {e}")
+            return
+        if not opened:
+            print(f"[{self.device_name}] 没有可用的数据流")
+            return
         while self.running:
             try:
-                frame = self.frame_stream.read_frame()
-
-                timestamp = time.time()
-                if frame is None:
-                    print(f"[{self.device_name}] 读取帧失败")
+                ready = openni2.wait_for_any_stream(self.frame_streams, timeout=2)
+                if ready is None:
+                    print(f"[{self.device_name}] 等待数据流超时")
                     continue
+                stream = self.open_streams[self.frame_streams.index(ready)]
+                frame = ready.read_frame()
+                timestamp = self.clock.now(self.device_name)
             except Exception:
+                frame = None
+            if frame is None:
                 print(f"[{self.device_name}] 读取帧失败")
-            finally:
-                pass
-
-                self.current, frame_data = self.get_current_help(frame)
-                if self.one_frame is None:
-                    self.one_frame = frame_data
-                if BaseDevice.recording and self.allow_record:
-                    self.put_data_to_buffer((frame_data, timestamp))
-
-    def get_current_help(self,frame: openni2.VideoFrame):
-        data = np.array(frame.get_buffer_as_uint16()).reshape(480, 640)
-        #左右翻转
-        data = cv2.flip(data, 1)
-        image = cv2.normalize(data, None, 0, 255, cv2.NORM_MINMAX)
-        image = image.astype(np.uint8)
-        return image,data
-    
+                time.sleep(0.01)
+                continue
+            # 直接映射 OpenNI 帧缓冲，不拷贝；翻转和归一化推迟到预览时
+            data = self.frame_view(stream, frame)
+            self.current[stream] = (frame, data)
+            if stream not in self.one_frames:
+                self.one_frames[stream] = data.copy()
+                if stream == self.streams[0]:
+                    self.one_frame = self.one_frames[stream]
+            if BaseDevice.recording and self.allow_record:
+                buffer = self.buffers.get(stream)
+                if buffer is None:
+                    buffer = self._create_stream_buffer(stream, data)
+                # 写入按帧形状预分配的环形缓冲是唯一的一次拷贝，不保留 OpenNI 帧缓冲的视图
+                buffer.put(data, timestamp, frame_index=frame.frameIndex, device_timestamp=frame.timestamp)
+
+    @staticmethod
+    def frame_view(stream, frame: openni2.VideoFrame) -> np.ndarray:
+        """OpenNI 帧缓冲的视图：depth/ir 为 (height, width) uint16，color 为 (height, width, 3) RGB，帧对象存活期间有效"""
+        if stream == "color":
+            return np.frombuffer(frame.get_buffer_as_uint8(), dtype=np.uint8).reshape(frame.height, frame.width, 3)
+        return np.frombuffer(frame.get_buffer_as_uint16(), dtype=np.uint16).reshape(frame.height, frame.width)
+
+    @staticmethod
+    def to_display(data: np.ndarray) -> np.ndarray:
+        """左右翻转并转为 uint8 BGR 图像，用于预览和导出"""
+        if data.ndim == 3:
+            image = cv2.cvtColor(data, cv2.COLOR_RGB2BGR)
+        else:
+            image = cv2.normalize(data, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return cv2.flip(image, 1)
+
     def get_current_data(self):
-        if self.current is not None:
-            return self.current
-        return None
+        """各路数据流的当前帧横向拼接"""
+        images = [self.to_display(self.current[stream][1]) for stream in self.streams if stream in self.current]
+        if not images:
+            return None
+        height = min(image.shape[0] for image in images)
+        images = [image if image.shape[0] == height else
+                  cv2.resize(image, (image.shape[1] * height // image.shape[0], height)) for image in images]
+        return images[0] if len(images) == 1 else cv2.hconcat(images)
+
+    def record_meta_info(self) -> dict:
+        meta_info = super().record_meta_info()
+        meta_info["horizontal_flip"] = True  # 保存的是传感器原始方向，显示时需左右翻转
+        meta_info["streams"] = self.streams
+        return meta_info
+
+    def create_buffer(self, one_frame=None) -> RingBuffer:
+        """
+        各路数据流的环形缓冲在录制中该流的首帧到达时按帧形状创建（_create_stream_buffer），
+        这里只清空上次录制的缓冲，返回的占位缓冲在第一路流的缓冲创建后被替换（用于丢帧统计）。
+        """
+        self.buffers = {}
+        return RingBuffer(1)
+
+    def _create_stream_buffer(self, stream, data) -> RingBuffer:
+        buffer = super().create_buffer(self.one_frames.get(stream, data))
+        self.buffers[stream] = buffer
+        if stream == self.streams[0]:
+            self.buffer = buffer
+        return buffer
+
+    def record(self):
+        self.reading_buffer = True
+        self.writers = {}
+        try:
+            while BaseDevice.recording:
+                idle = True
+                # 采集线程会在录制中新增缓冲，遍历副本
+                for stream, buffer in list(self.buffers.items()):
+                    batch = buffer.get_batch(timeout=0)
+                    if batch is None:
+                        continue
+                    idle = False
+                    writer = self.writers.get(stream)
+                    if writer is None:
+                        # 写入器在该流第一批数据到达时创建，此时帧形状已知
+                        writer = self.open_writer(self.stream_name(stream), self.encoders.get(stream),
+                                                  self.one_frames[stream])
+                        self.writers[stream] = writer
+                    frames, timestamps, fields = batch
+                    writer.extend(frames, timestamps, **fields)
+                    if stream == self.streams[0]:
+                        self.frame_count += len(timestamps)
+                if idle:
+                    time.sleep(RingBuffer.POLL_INTERVAL)
+        finally:
+            self.reading_buffer = False
+
+    def _save_data_all(self):
+        while self.reading_buffer:
+            time.sleep(0.1)
+        if not self.writers:
+            print(f"[{self.device_name}] 无数据保存")
+            return
+        for stream in self.streams:
+            if stream not in self.writers:
+                print(f"[{self.device_name}] {stream} 录制期间没有收到数据")
+        for stream, writer in self.writers.items():
+            writer.close()
+            print(f"[{self.device_name}] {stream} 数据保存到 {writer.folder}，帧长度为{writer.frame_count}，"
+                  f"缓冲区满丢弃{self.buffers[stream].overflow}帧")
+        self.ini_data_buffer()
+
+    def ini_data_buffer(self):
+        self.frame_count = 0
+        self.writers = {}
+        self.writer = None
 
     def release(self):
-        self.frame_stream.stop()
-        self.dev.close()
-        openni2.unload()
\ No newline at end of file
+        for frame_stream in self.frame_streams:
+            frame_stream.stop()
+        if self.dev is not None:
+            self.dev.close()
+        openni2.unload()
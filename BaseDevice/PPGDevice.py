@@ -1,9 +1,8 @@
-import cv2
+import queue
 import numpy as np
 from BaseDevice.util.RppgCollector import RppgCollector
+from BaseDevice.util.WaveformPlot import WaveformPlot
 from BaseDevice.BaseDevice import BaseDevice
-import os
-import time
 class PPGDevice(BaseDevice):
     def __init__(self, **kwargs):
         device_name = kwargs.get("device_name")
@@ -11,119 +10,43 @@ class PPGDevice(BaseDevice):
         meta_info = kwargs.get("meta_info")
         port = kwargs.get("port")
         super().__init__(device_name, frame_rate=frame_rate)
-        self.ch1_show = []
-        self.ch2_show = []
         self.meta_info = meta_info if meta_info else {}
         self.port = port
         self.show_time = 5
-        self.show_window = self.show_time * self.frame_rate//8
+        self.show_window = self.show_time * self.frame_rate
+        self.plot = WaveformPlot(3, self.show_window)
         self.rppg_collector = None
 
     def _collect_loop(self):
-        self.rppg_collector = RppgCollector(self.port)
+        self.rppg_collector = RppgCollector(self.port, clock=self.clock, device_name=self.device_name)
         while self.running:
+            # 整批读取解析好的 (N,3) int16 [ch1,ch2,ch3] 和 (N,) 时间戳，全部采样原样录制
             try:
-                data = self.rppg_collector.read(len=8) # 返回[(ch1,ch2,ch3,timestamp),(ch1,ch2,ch3,timestamp),(ch1,ch2,ch3,timestamp),(ch1,ch2,ch3,timestamp)] 长度为4
-                if data is None:
-                    print('asdsad')
-                    print(f"[{self.device_name}] 读取帧失败")
-                    continue
-                if self.one_frame is None:
-                    self.one_frame = np.array([data[0][0],data[0][1]])
-                ch1 = [d[0] for d in data]
-                ch2 = [d[1] for d in data]
-                ch = [[d[0],d[1]] for d in data]
-                timestamp = [d[3] for d in data]
-                self.ch1_show.append(ch1[0])
-                self.ch2_show.append(ch2[0])
-                if len(self.ch1_show) > self.show_window:
-                    self.ch1_show = self.ch1_show[-self.show_window:]
-                    self.ch2_show = self.ch2_show[-self.show_window:]
-            except Exception:
-                print(f"[{self.device_name}] 读取帧失败")
-            finally:
-                if BaseDevice.recording and self.allow_record:
-                    self.put_data_to_buffer((ch,timestamp))
-    
-    def record(self):
-        self.reading_buffer = True
-        while BaseDevice.recording:
-            try:
-                frame, timestamp = self.buffer.get(timeout=1)
-                self.data[self.frame_count:self.frame_count+len(frame)] = frame
-                self.timestamps.extend(timestamp)
-                self.frame_count += len(frame)
-            except:
+                frames, timestamps = self.rppg_collector.read_block(timeout=1)
+            except queue.Empty:
+                print(f"[{self.device_name}] 读取帧超时")
                 continue
-        self.reading_buffer = False
-
-    def _save_data_all(self):
-        while self.reading_buffer:
-            time.sleep(0.1)
-        if self.data is None:
-            print(f"[{self.device_name}] 无数据保存")
-            return
-        folder = os.path.join(BaseDevice.save_floder,self.device_name)
-        os.makedirs(folder, exist_ok=True)
-        start = time.time()
-        print(f"[{self.device_name}]转换数据格式耗时：{time.time() - start:.4f}s")
-        l = len(self.timestamps)
-        filename = os.path.join(folder, f"{self.timestamps[0]}f{self.frame_rate}c{l}.npz")
+            if self.one_frame is None:
+                self.one_frame = frames[0].copy()
+            self.plot.push(frames)
+            if BaseDevice.recording and self.allow_record:
+                self.put_batch_to_buffer(frames, timestamps)
 
-        # 保存多个变量
-        np.savez(
-            filename,
-            device_name=self.device_name,
-            frame_rate=self.frame_rate,
-            timestamps=np.array(self.timestamps,dtype=np.float64),
-            frames=self.data[:l],
-            meta_info=BaseDevice.meta_data
-        )
-        print(f"[{self.device_name}] 数据保存到 {filename}, 帧长度为{l}，整体耗时：{time.time() - start:.4f}s")
-        del self.data
-        del self.timestamps
-        self.ini_data_buffer()
+    def ini_data_buffer(self):
+        super().ini_data_buffer()
+        if self.rppg_collector is not None:
+            self.rppg_collector.dropped = 0
 
+    def _save_data_all(self):
+        if self.rppg_collector is not None:
+            print(f"[{self.device_name}] 串口读取队列满丢弃{self.rppg_collector.dropped}个采样")
+        super()._save_data_all()
+    
     def get_current_data(self):
         return self.get_current_data_help()
     
     def get_current_data_help(self):
-        width, height = 560, 420
-        img = np.zeros((height, width, 3), dtype=np.uint8) 
-        length = len(self.ch1_show)
-        if length == 0:
-            return img 
-
-        ch1_data = np.array(self.ch1_show)
-        ch2_data = np.array(self.ch2_show)
-
-        min_val1, max_val1 = np.min(ch1_data), np.max(ch1_data)
-        min_val2, max_val2 = np.min(ch2_data), np.max(ch2_data)
-        if max_val1 == min_val1:
-            max_val += 1  # 防止除零
-        if max_val2 == min_val2:
-            max_val += 1  # 防止除零
-
-        scale1 = (height * 0.8) / (max_val1 - min_val1)
-        offset1 = height * 0.1
-
-        scale2 = (height * 0.8) / (max_val2 - min_val2)
-        offset2 = height * 0.1
-
-
-        ch1_y = height - ((ch1_data - min_val1) * scale1 + offset1).astype(np.int32)
-        ch2_y = height - ((ch2_data - min_val2) * scale2 + offset2).astype(np.int32)
-
-        x = np.arange(length)
-
-        for i in range(length - 1):
-            cv2.line(img, (x[i], ch1_y[i]), (x[i+1], ch1_y[i+1]), (0, 255, 0), 1) 
-            cv2.line(img, (x[i], ch2_y[i]), (x[i+1], ch2_y[i+1]), (0, 0, 255), 1)  
-
-        cv2.putText(img, 'CH1', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
-        cv2.putText(img, 'CH2', (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
-
-        return img
+        return self.plot.render()
         
     def release(self):
-        self.rppg_collector.close()
\ No newline at end of file
+        self.rppg_collector.close()
@@ -0,0 +1,172 @@
+import time
+import threading
+import multiprocessing
+from BaseDevice.BaseDevice import BaseDevice
+from BaseDevice.util.PreviewChannel import PreviewChannel
+
+
+def run_device_worker(device_class, device_kwargs, conn, preview, preview_interval, clock_state):
+    """
+    子进程入口：在独立解释器中创建并运行真实设备，采集线程和 record 线程都在子进程内，
+    预览帧由设备写入共享内存中的预览通道，录制开始/停止/保存命令通过管道接收。
+    子进程载入主进程的时钟锚点，各进程的时间戳在同一时间轴上。
+    fork 启动时子进程继承了主进程的设备表（其中是各设备的代理），这里清空，子进程只录制自己的设备。
+    """
+    BaseDevice.clock.load(clock_state)
+    BaseDevice.devices = {}
+    device = device_class(**device_kwargs)
+    device.preview = preview
+    device.preview_interval = preview_interval
+    device.start()
+    send_lock = threading.Lock()
+
+    def reply(*message):
+        with send_lock:
+            conn.send(message)
+
+    def save():
+        try:
+            device._save_data_all()
+            reply("saved", device.buffer.overflow)
+        except Exception as e:
+            reply("error", "save", repr(e))
+
+    while True:
+        try:
+            command, *args = conn.recv()
+        except EOFError:
+            # 主进程已退出
+            device.stop()
+            break
+        # 单个命令失败只回报错误，子进程继续运行
+        try:
+            if command == "start_record":
+                save_floder, meta_data = args
+                BaseDevice.save_floder = save_floder
+                BaseDevice.meta_data = meta_data
+                device.allow_record = True
+                device.prepare_record()
+                BaseDevice.recording = True
+                threading.Thread(target=device.record, daemon=True).start()
+            elif command == "stop_record":
+                BaseDevice.recording = False
+                device.report_record_stop()
+            elif command == "save":
+                threading.Thread(target=save, daemon=True).start()
+            elif command == "stop":
+                device.stop()
+                break
+        except Exception as e:
+            reply("error", command, repr(e))
+
+
+class ProcessDevice(BaseDevice):
+    """
+    多进程采集模式下 GUI 进程中的设备代理（可选）。
+    真实设备在子进程中运行 _collect_loop 和 record，不与 GUI 争抢 GIL；
+    代理保持与 BaseDevice 相同的 start/stop/get_current_data/allow_record 接口。
+    """
+    STOP_TIMEOUT = 10
+    POLL_INTERVAL = 0.5  # 等待子进程回复时检查其是否存活的间隔（秒）
+
+    def __init__(self, device_class, **kwargs):
+        device_name = kwargs.get("device_name")
+        frame_rate = kwargs.get("frame_rate", 30)
+        preview_interval = kwargs.pop("preview_interval", BaseDevice.preview_interval)
+        super().__init__(device_name, frame_rate=frame_rate)
+        self.device_class = device_class
+        self.device_kwargs = device_class.worker_kwargs(kwargs)
+        self.preview_interval = preview_interval
+        self.preview = PreviewChannel(shared=True)
+        self.conn, self.child_conn = multiprocessing.Pipe()
+        self.conn_lock = threading.Lock()
+        self.process = None
+
+    def send(self, *command) -> bool:
+        try:
+            with self.conn_lock:
+                self.conn.send(command)
+            return True
+        except OSError as e:
+            print(f"[{self.device_name}] 子进程命令 {command[0]} 发送失败: {e!r}")
+            return False
+
+    def start(self):
+        print(f"[{self.device_name}] 开始采集（子进程）...")
+        self.running = True
+        self.process = multiprocessing.Process(
+            target=run_device_worker,
+            args=(self.device_class, self.device_kwargs, self.child_conn, self.preview, self.preview_interval,
+                  BaseDevice.clock.state()),
+            daemon=True,
+        )
+        self.process.start()
+        # 子进程一端只留给子进程，子进程退出后本端 recv 能得到 EOF
+        self.child_conn.close()
+
+    def stop(self):
+        self.running = False
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.send("stop")
+            self.process.join(timeout=self.STOP_TIMEOUT)
+        if self.process.is_alive():
+            print(f"[{self.device_name}] 子进程未正常退出，强制终止...")
+            self.process.terminate()
+            self.process.join()
+
+    def record(self):
+        """录制在子进程中进行，这里只转发开始/停止命令"""
+        self.reading_buffer = True
+        try:
+            self.send("start_record", BaseDevice.save_floder, BaseDevice.meta_data)
+            while BaseDevice.recording:
+                time.sleep(0.05)
+            self.send("stop_record")
+        finally:
+            self.reading_buffer = False
+
+    def _save_data_all(self):
+        while self.reading_buffer:
+            time.sleep(0.1)
+        if not self.send("save"):
+            self.report_worker_exit()
+            return
+        # 等待保存结果，期间子进程退出则报告失败，不无限阻塞
+        while True:
+            if not self.conn.poll(self.POLL_INTERVAL):
+                if self.process.is_alive():
+                    continue
+                if not self.conn.poll():
+                    self.report_worker_exit()
+                    return
+            try:
+                reply, *args = self.conn.recv()
+            except EOFError:
+                self.report_worker_exit()
+                return
+            if reply == "saved":
+                print(f"[{self.device_name}] 子进程数据保存完成，缓冲区满丢弃{args[0]}帧")
+                return
+            command, message = args
+            print(f"[{self.device_name}] 子进程执行 {command} 失败: {message}")
+            if command == "save":
+                return
+
+    def report_worker_exit(self):
+        self.process.join(timeout=1)
+        print(f"[{self.device_name}] 子进程已退出（退出码 {self.process.exitcode}），数据保存失败")
+
+    def ini_data_buffer(self):
+        self.frame_count = 0
+
+    def report_record_stop(self):
+        # 代理没有缓冲区，丢帧数由子进程在保存完成后返回
+        print(f"[{self.device_name}] 停止录制（子进程）...")
+
+    def get_current_data(self):
+        return self.preview.read()
+
+    def release(self):
+        pass
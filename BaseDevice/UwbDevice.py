@@ -1,9 +1,10 @@
 import time
-import cv2
 import numpy as np
 from BaseDevice.util.xep import xep
+from BaseDevice.util.Waterfall import Waterfall
 from BaseDevice.BaseDevice import BaseDevice
 class UwbDevice(BaseDevice):
+    buffer_fields = {"frame_counter": np.uint32}  # 模块硬件帧计数，与时间戳一起保存
     def __init__(self, **kwargs):
         device_name = kwargs.get("device_name")
         frame_rate = kwargs.get("frame_rate", 200)
@@ -19,9 +20,15 @@ class UwbDevice(BaseDevice):
         }
         self.meta_info = meta_info
         self.port = port
-        self.data_show = []
         self.show_time = 5
         self.show_window = self.show_time * self.frame_rate
+        self.show_frames = None  # 最近 show_window 帧的 complex64 环形数组，幅值在预览时才批量计算
+        self.show_head = 0  # 累计写入预览的帧数
+        self.rendered_head = 0  # 已渲染进瀑布图的帧数
+        self.waterfall = Waterfall(self.show_window)
+        self.last_counter = None
+        self.received_frames = 0  # 本次录制收到的帧数
+        self.dropped_frames = 0  # 本次录制中硬件帧计数不连续（模块到主机之间丢失）的帧数
     
     def _collect_loop(self):
         self.uwb_radar = xep(self.port)
@@ -35,41 +42,72 @@ class UwbDevice(BaseDevice):
                                  ) 
         self.uwb_radar.start_streaming()
         while self.running:
-            frame = self.uwb_radar.read_frame()
-            timestamp = time.time()
-            if frame is None:
+            batch = self.uwb_radar.read_frames()
+            now = self.clock.now(self.device_name)
+            if batch is None:
+                time.sleep(0.001)
                 continue
+            frames, counters = batch
+            # 一次取出的多帧按硬件帧计数和帧率回推各自的时间戳
+            timestamps = now - (int(counters[-1]) - counters.astype(np.int64)) / self.frame_rate
             if self.one_frame is None:
-                self.one_frame = np.array(frame)
-            self.data_show.append(np.abs(frame))
-            if len(self.data_show) > self.show_window:
-                self.data_show.pop(0)
+                self.one_frame = frames[0].copy()
+            self.push_show(frames)
             if BaseDevice.recording and self.allow_record:
-                self.put_data_to_buffer((frame, timestamp))
+                self.count_gaps(counters)
+                self.put_batch_to_buffer(frames, timestamps, frame_counter=counters)
+
+    def push_show(self, frames):
+        """把一批帧写入预览环形数组"""
+        if self.show_frames is None:
+            self.show_frames = np.zeros((self.show_window, frames.shape[1]), dtype=frames.dtype)
+        frames = frames[-self.show_window:]
+        n = len(frames)
+        i = self.show_head % self.show_window
+        first = min(n, self.show_window - i)
+        self.show_frames[i:i + first] = frames[:first]
+        self.show_frames[:n - first] = frames[first:]
+        self.show_head += n
+
+    def count_gaps(self, counters):
+        """按硬件帧计数统计丢帧"""
+        counters = counters.astype(np.int64)
+        if self.last_counter is not None:
+            counters = np.concatenate([[self.last_counter], counters])
+            self.received_frames -= 1
+        gaps = np.diff(counters) - 1
+        self.dropped_frames += int(gaps[gaps > 0].sum())
+        self.received_frames += len(counters)
+        self.last_counter = counters[-1]
+
+    def ini_data_buffer(self):
+        super().ini_data_buffer()
+        self.last_counter = None
+        self.received_frames = 0
+        self.dropped_frames = 0
+
+    def _save_data_all(self):
+        print(f"[{self.device_name}] 本次录制收到{self.received_frames}帧，硬件帧计数不连续丢失{self.dropped_frames}帧")
+        super()._save_data_all()
     
     def get_current_data(self):
         return self.get_current_data_help()
     
     def get_current_data_help(self):
-        width, height = 560, 420
-        # data_show形状为[frame_nums, 50]
-        data = np.array(self.data_show) 
-        if data.size == 0:
-            return np.zeros((height, width), dtype=np.uint8)
-
-        # 归一化到0~255
-        min_val = np.min(data)
-        max_val = np.max(data)
-        if max_val == min_val:
-            max_val = min_val + 1  # 防止除零
+        """只把上次预览之后的新帧计算幅值并渲染进瀑布图"""
+        head = self.show_head
+        n = min(head - self.rendered_head, self.show_window)
+        if n > 0:
+            self.waterfall.push(np.abs(self.recent_frames(head, n)))
+            self.rendered_head = head
+        return self.waterfall.get_image()
 
-        norm_data = (data - min_val) / (max_val - min_val)
-        #gamma校正
-        norm_data = np.power(norm_data, 0.5)
-        norm_data = (norm_data * 255).astype(np.uint8)
+    def recent_frames(self, head, n) -> np.ndarray:
+        """按时间顺序取出预览环形数组中截至 head 的最近 n 帧"""
+        end = head % self.show_window
+        if n <= end:
+            return self.show_frames[end - n:end]
+        return np.concatenate((self.show_frames[end - n:], self.show_frames[:end]))
 
-        img = cv2.resize(norm_data.T, (width, height), interpolation=cv2.INTER_LINEAR)
-        return img
-    
     def release(self):
         self.uwb_radar.stop_streaming()
\ No newline at end of file
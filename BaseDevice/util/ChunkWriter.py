@@ -0,0 +1,148 @@
+import os
+import time
+import zipfile
+import threading
+import numpy as np
+from queue import Queue
+from BaseDevice.util.ChunkedArray import ChunkedArray
+
+
+class ChunkWriter:
+    """
+    流式分块写入器：record线程持续 append 数据，满足时长或大小阈值后整块交给后台线程写盘。
+    每个分块是一个独立完整的 npz 文件（先写临时文件再原子重命名），进程崩溃时已落盘的分块不受影响，
+    内存中最多只保留 当前块 + max_pending 个待写块，与录制时长无关。
+    分块数据存放在按固定块增长的 ChunkedArray 中，写盘时逐块流式写入 npz，不做整体拼接；
+    设置 memory_budget 后单个分块超出预算的部分溢出到保存目录下的临时文件。
+    """
+    CHUNK_SECONDS = 10
+    CHUNK_BYTES = 256 * 1024 * 1024
+    MAX_PENDING = 4
+
+    def __init__(self, folder, device_name, frame_rate, meta_info=None,
+                 chunk_seconds=None, chunk_bytes=None, max_pending=None, memory_budget=None):
+        self.folder = folder
+        self.device_name = device_name
+        self.frame_rate = frame_rate
+        self.meta_info = meta_info
+        self.chunk_seconds = chunk_seconds or self.CHUNK_SECONDS
+        self.chunk_bytes = chunk_bytes or self.CHUNK_BYTES
+        self.memory_budget = memory_budget
+        os.makedirs(folder, exist_ok=True)
+
+        self.chunk_index = 0
+        self.frame_count = 0
+        self.files = []
+        self._reset_chunk()
+        self.pending = Queue(maxsize=max_pending or self.MAX_PENDING)
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def _reset_chunk(self):
+        self.frames = None
+        self.timestamps = None
+        self.fields = {}
+        self.chunk_start = None
+
+    def _new_array(self, sample: np.ndarray, block_frames=None, memory_budget=None) -> ChunkedArray:
+        return ChunkedArray(sample.shape[1:], sample.dtype, block_frames,
+                            memory_budget=memory_budget, spill_dir=self.folder)
+
+    def _start_chunk(self, frames, timestamps, fields):
+        """按首批数据的形状创建当前块的存储，块大小不超过一个分块的预计帧数"""
+        self.chunk_start = timestamps[0]
+        self.frames = self._new_array(frames, memory_budget=self.memory_budget)
+        chunk_frames = int(self.frame_rate * self.chunk_seconds) + 1 if self.frame_rate else None
+        if chunk_frames and chunk_frames < self.frames.block_frames:
+            self.frames.block_frames = chunk_frames
+        block_frames = self.frames.block_frames
+        self.timestamps = self._new_array(timestamps, block_frames)
+        self.fields = {k: self._new_array(v, block_frames) for k, v in fields.items()}
+
+    def append(self, frame, timestamp, **fields):
+        """追加单帧，fields 为逐帧附加量（如 frame_lens）"""
+        frame = np.asarray(frame)
+        self._append_parts(frame[np.newaxis], np.array([timestamp], dtype=np.float64),
+                           {k: np.asarray(v)[np.newaxis] for k, v in fields.items()})
+
+    def extend(self, frames, timestamps, **fields):
+        """追加一批帧，frames/timestamps/fields 的第一维为帧数"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps) == 0:
+            return
+        self._append_parts(np.asarray(frames), timestamps,
+                           {k: np.asarray(v) for k, v in fields.items()})
+
+    def _append_parts(self, frames, timestamps, fields):
+        if self.chunk_start is None:
+            self._start_chunk(frames, timestamps, fields)
+        self.frames.extend(frames)
+        self.timestamps.extend(timestamps)
+        for k, v in fields.items():
+            self.fields[k].extend(v)
+        self.frame_count += len(timestamps)
+        if (timestamps[-1] - self.chunk_start >= self.chunk_seconds
+                or self.frames.nbytes >= self.chunk_bytes):
+            self.flush()
+
+    def flush(self):
+        """把当前块交给后台线程，待写队列满时阻塞（背压）"""
+        if self.chunk_start is None:
+            return
+        self.pending.put((self.chunk_index, self.frames, self.timestamps, self.fields))
+        self.chunk_index += 1
+        self._reset_chunk()
+
+    def close(self):
+        """写出剩余数据并等待后台线程结束"""
+        self.flush()
+        self.pending.put(None)
+        self.thread.join()
+
+    def _write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            try:
+                self._write_chunk(*item)
+            except Exception as e:
+                print(f"[{self.device_name}] 分块 {item[0]} 写入失败: {e}")
+
+    def _write_chunk(self, chunk_index, frames, timestamps, fields):
+        start = time.time()
+        l = len(timestamps)
+        filename = os.path.join(self.folder, f"{next(timestamps.iter_blocks())[0]}f{self.frame_rate}c{l}.npz")
+        tmp_filename = filename + ".tmp"
+        arrays = dict(
+            device_name=self.device_name,
+            frame_rate=self.frame_rate,
+            chunk_index=chunk_index,
+            timestamps=timestamps,
+            frames=frames,
+            meta_info=self.meta_info,
+        )
+        arrays.update(fields)
+        try:
+            write_npz(tmp_filename, arrays)
+        finally:
+            for value in arrays.values():
+                if isinstance(value, ChunkedArray):
+                    value.close()
+        os.replace(tmp_filename, filename)
+        self.files.append(filename)
+        print(f"[{self.device_name}] 分块{chunk_index}保存到 {filename}, 帧长度为{l}，耗时：{time.time() - start:.4f}s")
+
+
+def write_npz(filename, arrays: dict):
+    """
+    与 np.savez 相同格式（不压缩）的 npz，ChunkedArray 逐块流式写入 zip 成员，不在内存中拼出整个数组。
+    其他值按 np.savez 的方式转为数组保存。
+    """
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for name, value in arrays.items():
+            with zf.open(name + ".npy", "w", force_zip64=True) as f:
+                if isinstance(value, ChunkedArray):
+                    value.write_to(f)
+                else:
+                    np.lib.format.write_array(f, np.asanyarray(value), allow_pickle=True)
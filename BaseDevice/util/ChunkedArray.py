@@ -0,0 +1,112 @@
+import os
+import tempfile
+import numpy as np
+
+
+class ChunkedArray:
+    """
+    按固定大小的块增长的帧数组：追加时写入当前块，写满再分配新块，已有数据从不搬移（均摊 O(1)），
+    不需要按录制时长预分配。内存中的块总大小超过 memory_budget 后，新块改为 spill_dir 下的内存映射临时文件。
+    保存时用 write_to 按块顺序写出，不做整体拼接。
+    """
+    BLOCK_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, shape, dtype, block_frames=None, memory_budget=None, spill_dir=None):
+        """
+        shape/dtype: 单帧形状和类型
+        block_frames: 每块帧数，默认按 BLOCK_BYTES 计算
+        memory_budget: 内存中块的总字节数上限，None 为不限制
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        frame_nbytes = max(int(np.prod(self.shape, dtype=np.int64)) * self.dtype.itemsize, 1)
+        self.block_frames = block_frames or max(1, self.BLOCK_BYTES // frame_nbytes)
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.blocks = []
+        self.spill_files = []
+        self.memory_nbytes = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return self.length * int(np.prod(self.shape, dtype=np.int64)) * self.dtype.itemsize
+
+    def _new_block(self):
+        shape = (self.block_frames,) + self.shape
+        nbytes = int(np.prod(shape, dtype=np.int64)) * self.dtype.itemsize
+        # 对象数组无法映射到文件，始终留在内存
+        if (self.memory_budget is not None and self.memory_nbytes + nbytes > self.memory_budget
+                and self.dtype != object):
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            fd, filename = tempfile.mkstemp(suffix=".spill", dir=self.spill_dir)
+            os.close(fd)
+            self.spill_files.append(filename)
+            block = np.memmap(filename, dtype=self.dtype, mode="w+", shape=shape)
+        else:
+            block = np.empty(shape, dtype=self.dtype)
+            self.memory_nbytes += nbytes
+        self.blocks.append(block)
+        return block
+
+    def append(self, frame):
+        self.extend(np.asarray(frame, dtype=self.dtype)[np.newaxis])
+
+    def extend(self, frames):
+        """追加一批帧，第一维为帧数"""
+        n = len(frames)
+        done = 0
+        while done < n:
+            offset = self.length % self.block_frames
+            block = self._new_block() if offset == 0 else self.blocks[-1]
+            take = min(n - done, self.block_frames - offset)
+            block[offset:offset + take] = frames[done:done + take]
+            done += take
+            self.length += take
+
+    def iter_blocks(self):
+        """按顺序返回各块中已写入部分的视图"""
+        remaining = self.length
+        for block in self.blocks:
+            if remaining <= 0:
+                break
+            yield block[:min(remaining, self.block_frames)]
+            remaining -= self.block_frames
+
+    def to_array(self) -> np.ndarray:
+        """拼接成一个连续数组（会拷贝，只有一个块时返回视图）"""
+        blocks = list(self.iter_blocks())
+        if not blocks:
+            return np.empty((0,) + self.shape, dtype=self.dtype)
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    def write_to(self, f):
+        """以 .npy 格式逐块写入文件对象，内容与 np.save(f, self.to_array()) 相同"""
+        if self.dtype == object:
+            np.lib.format.write_array(f, self.to_array(), allow_pickle=True)
+            return
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.length,) + self.shape,
+        }
+        np.lib.format.write_array_header_1_0(f, header)
+        for block in self.iter_blocks():
+            # 按字节展平，zipfile 等按 len() 计长度的写入端也能正确处理
+            f.write(np.ascontiguousarray(block).reshape(-1).view(np.uint8))
+
+    def close(self):
+        """释放所有块并删除溢出的临时文件"""
+        self.blocks = []
+        self.memory_nbytes = 0
+        self.length = 0
+        for filename in self.spill_files:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+        self.spill_files = []
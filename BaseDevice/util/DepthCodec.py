@@ -0,0 +1,143 @@
+import zlib
+import cv2
+import numpy as np
+from functools import partial
+from BaseDevice.util.EncoderPool import FrameEncoder
+from BaseDevice.util.FrameContainer import FrameContainerReader
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+class DepthCodec(FrameEncoder):
+    """
+    16 位深度图无损编码，用于帧容器存储：
+        png   16 位灰度 PNG（cv2）
+        zlib  原始字节 zlib 压缩（标准库）
+        zstd  需要安装 zstandard
+        lz4   需要安装 lz4
+    delta=True 时除关键帧外编码与上一帧的差（uint16 按模 2^16 相减，解码时相加可逆），
+    每 keyframe_interval 帧一个关键帧，索引中 keyframe 字段标记，随机访问从最近的关键帧解起。
+    """
+    CODECS = ("png", "zlib", "zstd", "lz4")
+    fields = [("keyframe", "u1")]
+
+    def __init__(self, name="png", level=None, delta=False, keyframe_interval=30):
+        if name not in self.CODECS:
+            raise ValueError(f"不支持的深度编码: {name}")
+        if name == "zstd" and zstandard is None:
+            raise ValueError("zstd 编码需要安装 zstandard")
+        if name == "lz4" and lz4 is None:
+            raise ValueError("lz4 编码需要安装 lz4")
+        self.name = name
+        self.level = level
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.codec = f"depth-{name}" + ("+delta" if delta else "")
+        self.reset()
+
+    def reset(self):
+        self.prev = None
+        self.count = 0
+
+    def prepare(self, frame):
+        keyframe = not self.delta or self.prev is None or self.count % self.keyframe_interval == 0
+        prev = None if keyframe else self.prev
+        self.prev = frame
+        self.count += 1
+        return partial(self.encode, frame, prev), {"keyframe": int(keyframe)}
+
+    def encode(self, frame, prev=None) -> bytes:
+        if prev is not None:
+            frame = frame - prev  # uint16 回绕相减
+        frame = np.ascontiguousarray(frame)
+        if self.name == "png":
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 1 if self.level is None else self.level]
+            return cv2.imencode(".png", frame, params)[1].tobytes()
+        if self.name == "zlib":
+            return zlib.compress(frame.tobytes(), 1 if self.level is None else self.level)
+        if self.name == "zstd":
+            return zstandard.ZstdCompressor(level=3 if self.level is None else self.level).compress(frame.tobytes())
+        return lz4.frame.compress(frame.tobytes(), compression_level=0 if self.level is None else self.level)
+
+    def codec_info(self, one_frame) -> dict:
+        return {
+            "name": self.name,
+            "delta": self.delta,
+            "keyframe_interval": self.keyframe_interval,
+            "shape": list(one_frame.shape),
+            "dtype": one_frame.dtype.str,
+        }
+
+    @staticmethod
+    def decode(data, info: dict, prev=None) -> np.ndarray:
+        """解码一帧，差分帧需要传入上一帧的解码结果"""
+        name = info["name"]
+        if name == "png":
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        else:
+            data = bytes(data)
+            if name == "zlib":
+                raw = zlib.decompress(data)
+            elif name == "zstd":
+                raw = zstandard.ZstdDecompressor().decompress(data)
+            else:
+                raw = lz4.frame.decompress(data)
+            frame = np.frombuffer(raw, dtype=info["dtype"]).reshape(info["shape"])
+        if prev is not None:
+            frame = frame + prev
+        return frame
+
+
+class DepthReader:
+    """
+    读取 DepthCodec 编码的帧容器，按帧号返回与录制时逐位一致的深度图。
+    顺序读取时复用上一帧，随机访问差分帧时从之前最近的关键帧开始解码。
+    orient=True 时按元数据中的 horizontal_flip 返回翻转后的视图（用于导出）。
+    """
+
+    def __init__(self, path, orient=False):
+        self.reader = FrameContainerReader(path)
+        self.flip = orient and bool((self.reader.meta_info or {}).get("horizontal_flip"))
+        self.info = self.reader.meta["codec_info"]
+        self.keyframes = np.flatnonzero(self.reader.index["keyframe"])
+        self.last = (-1, None)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.reader.timestamps
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, i) -> np.ndarray:
+        frame = self.decode_frame(i)
+        return frame[:, ::-1] if self.flip else frame
+
+    def decode_frame(self, i) -> np.ndarray:
+        i = range(len(self))[i]
+        last_i, frame = self.last
+        if last_i == i:
+            return frame
+        if not self.info["delta"] or self.reader.index["keyframe"][i]:
+            start, frame = i, None
+        elif last_i != -1 and last_i < i and last_i >= self.keyframes[np.searchsorted(self.keyframes, i, "right") - 1]:
+            start = last_i + 1
+        else:
+            start, frame = self.keyframes[np.searchsorted(self.keyframes, i, "right") - 1], None
+        for k in range(start, i + 1):
+            prev = frame if (self.info["delta"] and not self.reader.index["keyframe"][k]) else None
+            frame = DepthCodec.decode(self.reader[k], self.info, prev)
+        self.last = (i, frame)
+        return frame
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,128 @@
+import time
+import cv2
+import queue
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FrameEncoder:
+    """
+    逐帧编码器接口：prepare 在提交线程中按帧顺序调用，返回 (编码任务, 附加索引字段)，
+    编码任务在线程池中执行并返回 bytes。有状态的编码（如帧间差分）在 prepare 中处理状态。
+    """
+    codec = "raw"
+    fields = []  # 附加的逐帧索引字段 [(name, dtype)]
+
+    def reset(self):
+        """每次录制开始时调用，清除帧间状态"""
+        pass
+
+    def prepare(self, frame):
+        return partial(self.encode, frame), {}
+
+    def encode(self, frame) -> bytes:
+        raise NotImplementedError
+
+    def codec_info(self, one_frame) -> dict:
+        """写入容器元数据的解码参数"""
+        return {}
+
+
+class JpegEncoder(FrameEncoder):
+    """BGR（rgb=True 时为 RGB）uint8 图像编码为 JPEG"""
+    codec = "mjpeg"
+
+    def __init__(self, quality=90, rgb=False):
+        self.quality = quality
+        self.rgb = rgb
+
+    def encode(self, frame) -> bytes:
+        if self.rgb:
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        return cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1].tobytes()
+
+
+class EncoderPool:
+    """
+    有序编码池，包装 FrameContainerWriter 等写入器（接口相同：append/extend/flush/close/files/frame_count）。
+    append 把编码任务提交到线程池（cv2/zlib 编码时释放 GIL），后台写线程按提交顺序取结果写入，
+    输出顺序与输入一致。排队任务达到 max_pending 时 append 阻塞（背压），阻塞时间计入统计，
+    采集线程写的是环形缓冲，不会被阻塞，积压表现为环形缓冲的丢帧计数。
+    """
+    MAX_PENDING = 16
+
+    def __init__(self, writer, encoder: FrameEncoder, workers=None, max_pending=None):
+        self.writer = writer
+        self.encoder = encoder
+        self.encoder.reset()
+        self.workers = workers or 2
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = queue.Queue(maxsize=max_pending or self.MAX_PENDING)
+        self.submitted = 0
+        self.max_depth = 0  # 排队任务数峰值
+        self.blocked_time = 0.0  # append 因队列满累计阻塞的时间
+        self.encode_time = 0.0  # 线程池累计编码时间
+        self.start_time = time.time()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    @property
+    def folder(self):
+        return self.writer.folder
+
+    @property
+    def files(self):
+        return self.writer.files
+
+    @property
+    def frame_count(self):
+        return self.writer.frame_count
+
+    def _timed(self, job):
+        start = time.perf_counter()
+        data = job()
+        self.encode_time += time.perf_counter() - start
+        return data
+
+    def append(self, frame, timestamp, **fields):
+        job, extra = self.encoder.prepare(frame)
+        fields.update(extra)
+        future = self.executor.submit(self._timed, job)
+        item = (future, timestamp, fields)
+        try:
+            self.pending.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self.pending.put(item)
+            self.blocked_time += time.perf_counter() - start
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self.pending.qsize())
+
+    def extend(self, frames, timestamps, **fields):
+        for i, frame in enumerate(frames):
+            self.append(frame, timestamps[i], **{k: v[i] for k, v in fields.items()})
+
+    def _write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            future, timestamp, fields = item
+            try:
+                self.writer.append(future.result(), timestamp, **fields)
+            except Exception as e:
+                print(f"[{self.writer.device_name}] 编码或写入失败: {e}")
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        self.executor.shutdown()
+        self.writer.close()
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        print(f"[{self.writer.device_name}] 编码池：{self.workers}线程，{self.submitted}帧，"
+              f"平均编码{self.encode_time / max(self.submitted, 1) * 1000:.1f}ms/帧，"
+              f"吞吐{self.submitted / elapsed:.1f}fps，队列峰值{self.max_depth}，背压阻塞{self.blocked_time:.2f}s")
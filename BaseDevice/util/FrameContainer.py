@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import numpy as np
+
+
+class FrameContainerWriter:
+    """
+    变长帧容器（只追加）：
+        <name>.bin   所有帧字节首尾相接
+        <name>.idx   每帧一条定长索引记录 (offset, length, timestamp, *extra_fields)
+        <name>.json  设备信息与索引 dtype
+    录制时逐帧追加，不做填充；索引在帧数据之后写入，崩溃时最多丢失最后未刷盘的几帧。
+    接口与 ChunkWriter 一致（append/extend/flush/close/files/frame_count）。
+    """
+    BLOB_SUFFIX = ".bin"
+    INDEX_SUFFIX = ".idx"
+    META_SUFFIX = ".json"
+    INDEX_DTYPE = [("offset", "<u8"), ("length", "<u4"), ("timestamp", "<f8")]
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, folder, device_name, frame_rate, meta_info=None, extra_fields=None, codec="mjpeg", codec_info=None):
+        """
+        extra_fields: 附加的逐帧索引字段，如 [("keyframe", "u1")]
+        codec_info: 解码所需参数（如深度图的形状和 dtype），写入 .json
+        """
+        self.folder = folder
+        self.device_name = device_name
+        self.frame_rate = frame_rate
+        self.meta_info = meta_info
+        self.codec = codec
+        self.codec_info = codec_info
+        self.index_dtype = np.dtype(self.INDEX_DTYPE + list(extra_fields or []))
+        os.makedirs(folder, exist_ok=True)
+
+        self.files = []
+        self.frame_count = 0
+        self.offset = 0
+        self.blob = None
+        self.index = None
+        self.last_flush = time.time()
+        self.record = np.zeros(1, dtype=self.index_dtype)
+
+    def _open(self, timestamp):
+        name = os.path.join(self.folder, f"{timestamp}f{self.frame_rate}")
+        with open(name + self.META_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump({
+                "device_name": self.device_name,
+                "frame_rate": self.frame_rate,
+                "codec": self.codec,
+                "codec_info": self.codec_info,
+                "index_dtype": self.index_dtype.descr,
+                "meta_info": self.meta_info,
+            }, f, ensure_ascii=False, default=str)
+        self.blob = open(name + self.BLOB_SUFFIX, "wb")
+        self.index = open(name + self.INDEX_SUFFIX, "wb")
+        self.files.append(name + self.BLOB_SUFFIX)
+
+    def append(self, frame, timestamp, **fields):
+        """追加一帧，frame 为 bytes 或一维 uint8 数组"""
+        if self.blob is None:
+            self._open(timestamp)
+        length = self.blob.write(frame)
+        record = self.record
+        record["offset"] = self.offset
+        record["length"] = length
+        record["timestamp"] = timestamp
+        for k, v in fields.items():
+            record[k] = v
+        self.index.write(record.tobytes())
+        self.offset += length
+        self.frame_count += 1
+        if time.time() - self.last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def extend(self, frames, timestamps, **fields):
+        for i, frame in enumerate(frames):
+            self.append(frame, timestamps[i], **{k: v[i] for k, v in fields.items()})
+
+    def flush(self):
+        if self.blob is None:
+            return
+        self.blob.flush()
+        self.index.flush()
+        self.last_flush = time.time()
+
+    def close(self):
+        if self.blob is None:
+            return
+        self.flush()
+        self.blob.close()
+        self.index.close()
+        print(f"[{self.device_name}] 帧容器保存到 {self.files[-1]}, 帧长度为{self.frame_count}，数据大小{self.offset / 1e6:.1f}MB")
+
+
+class FrameContainerReader:
+    """
+    以内存映射方式读取 FrameContainerWriter 写出的容器，按帧号随机访问，不整体载入内存。
+    path 可以是 .bin/.idx/.json 任意一个文件或不带后缀的前缀。
+    """
+
+    def __init__(self, path):
+        for suffix in (FrameContainerWriter.BLOB_SUFFIX, FrameContainerWriter.INDEX_SUFFIX, FrameContainerWriter.META_SUFFIX):
+            if path.endswith(suffix):
+                path = path[:-len(suffix)]
+        self.path = path
+        with open(path + FrameContainerWriter.META_SUFFIX, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.device_name = self.meta["device_name"]
+        self.frame_rate = self.meta["frame_rate"]
+        self.codec = self.meta.get("codec", "mjpeg")
+        self.meta_info = self.meta.get("meta_info")
+        index_dtype = np.dtype([tuple(d) for d in self.meta["index_dtype"]])
+
+        blob_size = os.path.getsize(path + FrameContainerWriter.BLOB_SUFFIX)
+        index_size = os.path.getsize(path + FrameContainerWriter.INDEX_SUFFIX)
+        index = np.fromfile(path + FrameContainerWriter.INDEX_SUFFIX, dtype=index_dtype,
+                            count=index_size // index_dtype.itemsize)
+        # 崩溃时索引可能领先于帧数据，只保留帧数据完整的部分
+        valid = index["offset"] + index["length"] <= blob_size
+        self.index = index[:np.count_nonzero(np.cumprod(valid))]
+        if blob_size > 0:
+            self.blob = np.memmap(path + FrameContainerWriter.BLOB_SUFFIX, dtype=np.uint8, mode="r")
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.index["timestamp"]
+
+    @property
+    def frame_lens(self) -> np.ndarray:
+        return self.index["length"]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i) -> np.ndarray:
+        """返回第 i 帧字节的 uint8 视图（零拷贝）"""
+        offset = int(self.index["offset"][i])
+        return self.blob[offset:offset + int(self.index["length"][i])]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
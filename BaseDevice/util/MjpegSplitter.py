@@ -0,0 +1,122 @@
+import re
+import time
+
+
+class MjpegSplitter:
+    """
+    增量式 MJPEG 字节流分帧器。
+    按 JPEG 段结构解析：SOI 之后按段长度跳过 APPn/DQT/DHT 等段（其中内嵌缩略图的 FFD9 不会被误判），
+    SOS 之后在熵编码数据中只查找真正的标记（跳过 FF00 填充和 RSTn），遇到 EOI 即输出一帧。
+    保存扫描位置，已扫描过的字节不会重复扫描；只在输出帧后把剩余的不完整帧移到缓冲开头。
+    """
+    SOI = b'\xff\xd8'
+    # 熵编码数据中的标记：FF 后跟非 00、非 RSTn(D0-D7)、非 FF 填充
+    ENTROPY_MARKER = re.compile(b'\xff[^\x00\xd0-\xd7\xff]')
+
+    SEEK_SOI, SEGMENT, ENTROPY = range(3)
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.pos = 0  # 下一个待扫描字节
+        self.frame_start = -1  # 当前帧 SOI 位置
+        self.state = self.SEEK_SOI
+        self.frame_count = 0  # 累计分出的帧数
+        self.fps = 0.0  # 最近一秒的分帧速率
+        self._window_start = time.time()
+        self._window_count = 0
+
+    def feed(self, chunk) -> list:
+        """追加一段字节流，返回其中所有完整的 JPEG 帧（bytes）"""
+        self.buffer.extend(chunk)
+        frames = []
+        with memoryview(self.buffer) as view:
+            while self._step(view, frames):
+                pass
+        self._compact()
+        self._update_fps(len(frames))
+        return frames
+
+    def _step(self, view, frames) -> bool:
+        """推进一步状态机，数据不足时返回 False"""
+        buf = self.buffer
+        n = len(buf)
+        if self.state == self.SEEK_SOI:
+            idx = buf.find(self.SOI, self.pos)
+            if idx == -1:
+                # 保留最后一个字节，可能是 SOI 的前半
+                self.pos = max(self.pos, n - 1)
+                return False
+            self.frame_start = idx
+            self.pos = idx + 2
+            self.state = self.SEGMENT
+            return True
+
+        if self.state == self.ENTROPY:
+            match = self.ENTROPY_MARKER.search(buf, self.pos)
+            if match is None:
+                # 末尾的 FF 还不能确定是否为标记，下次从它开始
+                self.pos = max(self.pos, n - 1)
+                return False
+            self.pos = match.start()
+            self.state = self.SEGMENT
+            return True
+
+        # SEGMENT：当前位置应是一个标记
+        pos = self.pos
+        while pos < n and buf[pos] == 0xFF and pos + 1 < n and buf[pos + 1] == 0xFF:
+            pos += 1  # 标记前的 FF 填充
+        self.pos = pos
+        if pos + 2 > n:
+            return False
+        if buf[pos] != 0xFF:
+            self._drop_frame()
+            return True
+        marker = buf[pos + 1]
+        if marker == 0xD9:
+            frames.append(bytes(view[self.frame_start:pos + 2]))
+            self.pos = pos + 2
+            self.frame_start = -1
+            self.state = self.SEEK_SOI
+            return True
+        if marker == 0xD8:
+            # 上一帧不完整，从新的 SOI 开始
+            self.frame_start = pos
+            self.pos = pos + 2
+            return True
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            self.pos = pos + 2
+            return True
+        if pos + 4 > n:
+            return False
+        length = (buf[pos + 2] << 8) | buf[pos + 3]
+        if length < 2:
+            self._drop_frame()
+            return True
+        self.pos = pos + 2 + length
+        if marker == 0xDA:
+            self.state = self.ENTROPY
+        return True
+
+    def _drop_frame(self):
+        """段结构损坏，丢弃当前帧，从当前位置之后重新找 SOI"""
+        self.frame_start = -1
+        self.state = self.SEEK_SOI
+
+    def _compact(self):
+        """丢弃已输出帧和帧间无用字节，偏移量随之平移"""
+        drop = self.frame_start if self.frame_start != -1 else min(self.pos, len(self.buffer))
+        if drop <= 0:
+            return
+        del self.buffer[:drop]
+        self.pos -= drop
+        if self.frame_start != -1:
+            self.frame_start = 0
+
+    def _update_fps(self, n_frames):
+        self.frame_count += n_frames
+        self._window_count += n_frames
+        now = time.time()
+        if now - self._window_start >= 1:
+            self.fps = self._window_count / (now - self._window_start)
+            self._window_start = now
+            self._window_count = 0
@@ -0,0 +1,70 @@
+import ctypes
+import cv2
+import numpy as np
+from multiprocessing.sharedctypes import RawArray
+
+
+class PreviewChannel:
+    """
+    设备预览通道：两个预览分辨率（默认 560x420，与 GUI 的 QLabel 一致）的 RGB888 槽位交替写入。
+    设备侧按固定间隔把 get_current_data() 缩放、转换颜色后写入后台槽，再切换前台槽；
+    GUI 侧直接用前台槽构造 QImage，不再做解码、缩放和颜色转换。
+    shared=True 时槽位位于共享内存，可在创建子进程时传入供多进程模式使用。
+    """
+    WIDTH = 560
+    HEIGHT = 420
+
+    def __init__(self, width=None, height=None, shared=False):
+        self.width = width or self.WIDTH
+        self.height = height or self.HEIGHT
+        slot_size = self.height * self.width * 3
+        if shared:
+            self.slots_raw = RawArray(ctypes.c_uint8, 2 * slot_size)
+            self.state_raw = RawArray(ctypes.c_int64, 2)
+        else:
+            self.slots_raw = bytearray(2 * slot_size)
+            self.state_raw = bytearray(2 * 8)
+        self._slots = None
+        self._state = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_slots"] = None
+        state["_state"] = None
+        return state
+
+    def _views(self):
+        if self._slots is None:
+            self._slots = np.frombuffer(self.slots_raw, dtype=np.uint8).reshape(2, self.height, self.width, 3)
+            self._state = np.frombuffer(self.state_raw, dtype=np.int64)  # [前台槽号, 写入次数]
+        return self._slots, self._state
+
+    def write(self, frame: np.ndarray):
+        """把 BGR 或灰度 uint8 图像按比例缩放居中写入后台槽，然后切换前后台"""
+        slots, state = self._views()
+        back = 1 - state[0]
+        slot = slots[back]
+        h, w = frame.shape[:2]
+        scale = min(self.width / w, self.height / h)
+        nw, nh = max(1, int(w * scale)), max(1, int(h * scale))
+        if (nw, nh) != (w, h):
+            frame = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_AREA)
+        y0, x0 = (self.height - nh) // 2, (self.width - nw) // 2
+        slot[:y0] = 0
+        slot[y0 + nh:] = 0
+        slot[:, :x0] = 0
+        slot[:, x0 + nw:] = 0
+        region = slot[y0:y0 + nh, x0:x0 + nw]
+        if frame.ndim == 2:
+            region[...] = frame[..., np.newaxis]
+        else:
+            region[...] = frame[..., 2::-1]  # BGR -> RGB
+        state[0] = back
+        state[1] += 1
+
+    def read(self):
+        """返回前台槽 (H, W, 3) RGB 视图（不拷贝），尚未写入时返回 None"""
+        slots, state = self._views()
+        if state[1] == 0:
+            return None
+        return slots[state[0]]
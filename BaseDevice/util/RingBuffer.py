@@ -0,0 +1,94 @@
+import time
+import numpy as np
+
+
+class RingBuffer:
+    """
+    单生产者单消费者环形缓冲，替代 queue.Queue 在采集线程与 record 线程之间传递帧。
+    给定 shape/dtype 时预分配 (capacity, *shape) 的数组，生产者原地写入；
+    否则（如变长 JPEG 字节）退化为存引用的 object 数组。
+    head 只由生产者修改，tail 只由消费者修改，不需要加锁；缓冲满时丢弃新帧并计数。
+    fields 给出随帧保存的附加标量列（如硬件帧计数），与时间戳一样预分配。
+    """
+    POLL_INTERVAL = 0.005
+
+    def __init__(self, capacity, shape=None, dtype=None, fields=None):
+        self.capacity = int(capacity)
+        self.shape = None if shape is None else tuple(shape)  # None 表示存引用的 object 缓冲
+        if shape is None:
+            self.frames = np.empty(self.capacity, dtype=object)
+        else:
+            self.frames = np.zeros((self.capacity, *shape), dtype=dtype)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self.fields = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in (fields or {}).items()}
+        self.head = 0  # 累计写入帧数
+        self.tail = 0  # 累计读出帧数
+        self.overflow = 0  # 因缓冲满丢弃的帧数
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def put(self, frame, timestamp, **fields) -> bool:
+        """写入一帧，缓冲满时丢弃并返回 False"""
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.overflow += 1
+            return False
+        i = head % self.capacity
+        self.frames[i] = frame
+        self.timestamps[i] = timestamp
+        for name, value in fields.items():
+            self.fields[name][i] = value
+        self.head = head + 1
+        return True
+
+    def put_batch(self, frames, timestamps, **fields) -> int:
+        """批量写入，空间不足时丢弃放不下的部分，返回实际写入帧数"""
+        head = self.head
+        n = min(len(timestamps), self.capacity - (head - self.tail))
+        self.overflow += len(timestamps) - n
+        if n <= 0:
+            return 0
+        i = head % self.capacity
+        first = min(n, self.capacity - i)
+        self.frames[i:i + first] = frames[:first]
+        self.timestamps[i:i + first] = timestamps[:first]
+        for name, values in fields.items():
+            self.fields[name][i:i + first] = values[:first]
+        if n > first:
+            self.frames[:n - first] = frames[first:n]
+            self.timestamps[:n - first] = timestamps[first:n]
+            for name, values in fields.items():
+                self.fields[name][:n - first] = values[first:n]
+        self.head = head + n
+        return n
+
+    def get_batch(self, timeout=None, max_n=None):
+        """
+        取出当前缓冲中的全部帧（最多 max_n 帧），返回 (frames, timestamps, fields) 的拷贝，
+        fields 为附加列名到数组的字典；超时仍无数据返回 None。
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self.head == self.tail:
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+        tail = self.tail
+        n = self.head - tail
+        if max_n is not None:
+            n = min(n, max_n)
+        i = tail % self.capacity
+        first = min(n, self.capacity - i)
+        if first == n:
+            take = lambda array: array[i:i + n].copy()
+        else:
+            take = lambda array: np.concatenate((array[i:], array[:n - first]))
+        frames = take(self.frames)
+        timestamps = take(self.timestamps)
+        fields = {name: take(array) for name, array in self.fields.items()}
+        if self.frames.dtype == object:
+            # 释放引用，避免缓冲长期持有大对象
+            self.frames[i:i + first] = None
+            self.frames[:n - first] = None
+        self.tail = tail + n
+        return frames, timestamps, fields
@@ -1,26 +1,35 @@
 import serial
-import struct
 import threading
 import time
 import queue
+import numpy as np
+from collections import deque
 from typing import Tuple, Optional
+from BaseDevice.util.SessionClock import SessionClock
 
 class RppgCollector:
     SERIAL_PORT = 'COM3'
     BAUD_RATE = 256000
     FRAME_HEADER = b'\xCC\xCC'
     FRAME_SIZE = 8  # 2字节头 + 6字节数据 (3个short)
-    MAX_QUEUE_SIZE = 30  # 最大缓存帧数，避免内存堆积
+    FRAME_DTYPE = np.dtype([("header", ">u2"), ("ch", ">i2", (3,))])  # 大端
+    SAMPLE_RATE = 1000
+    MAX_QUEUE_SIZE = 30  # 最大缓存批数，避免内存堆积
 
-    def __init__(self, port=None, baudrate=None, max_queue_size=None):
+    def __init__(self, port=None, baudrate=None, max_queue_size=None, sample_rate=None, clock=None, device_name=None):
         self.port = port or self.SERIAL_PORT
         self.baudrate = baudrate or self.BAUD_RATE
+        self.sample_rate = sample_rate or self.SAMPLE_RATE
         self.ser = None
         self.buffer = bytearray()
         self.data_queue = queue.Queue(maxsize=max_queue_size or self.MAX_QUEUE_SIZE)
+        self.pending = deque()
+        self.last_timestamp = None
+        self.dropped = 0  # 队列满时丢弃的采样数
         self.running = True
         self.thread = None
-        self.base_time = time.time()-time.perf_counter()
+        self.clock = clock or SessionClock()  # 时间戳来源，设备中传入共用的会话时钟
+        self.device_name = device_name  # 按设备名取会话时钟中的时间戳偏移
 
         try:
             self.ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
@@ -34,80 +43,90 @@ class RppgCollector:
     def _read_loop(self):
         while self.running:
             try:
-                # 尝试读取可用数据，最小读1字节避免空循环
-                data = self.ser.read(8)
-                if data:
-                    self.buffer.extend(data)
-
-                if len(self.buffer) < self.FRAME_SIZE:
+                # 一次读出串口中已到达的全部数据，至少读一帧避免空循环
+                data = self.ser.read(max(self.FRAME_SIZE, self.ser.in_waiting))
+                if not data:
                     continue
-
-                else:
-                    idx = self.buffer.find(self.FRAME_HEADER)
-                    if idx == -1:
-                        self.buffer.clear()
-                        continue
-                    if idx > 0:
-                        self.buffer = self.buffer[idx:]
-                    while len(self.buffer) >= self.FRAME_SIZE:
-                        frame_data = self.buffer[:self.FRAME_SIZE]
-                        timestamp = time.perf_counter()
-                        self.buffer = self.buffer[self.FRAME_SIZE:]
-                        ch1, ch2, ch3 = struct.unpack('>hhh', frame_data[2:8])
-                        # print(ch1, ch2, ch3, frame_data[2:4], frame_data[4:6], frame_data[6:8])
-                        frame = (ch1, ch2, ch3, timestamp+self.base_time)
-                        if self.data_queue.full():
-                            self.data_queue.get()
-                        self.data_queue.put(frame)
-
-                # 尝试解析帧
-                # while len(self.buffer) >= self.FRAME_SIZE:
-                #     # 查找帧头
-                #     idx = self.buffer.find(self.FRAME_HEADER)
-                #     if idx == -1:
-                #         # 没找到帧头，保留最后 FRAME_SIZE-1 字节继续等待
-                #         if len(self.buffer) > self.FRAME_SIZE:
-                #             self.buffer = self.buffer[-(self.FRAME_SIZE-1):]
-                #         break
-
-                #     if idx > 0:
-                #         # 丢弃帧头前的乱码
-                #         print(f"丢弃 {idx} 字节乱码数据")
-                #         self.buffer = self.buffer[idx:]
-
-                #     if len(self.buffer) < self.FRAME_SIZE:
-                #         break  # 数据不足，等待下一次读取
-
-                #     # 现在 buffer 以 FRAME_HEADER 开头，且长度足够
-                #     frame_data = self.buffer[:self.FRAME_SIZE]
-                #     self.buffer = self.buffer[self.FRAME_SIZE:]
-
-                #     # 解析三个通道
-                #     try:
-                #         ch1, ch2, ch3 = struct.unpack('>hhh', frame_data[2:8])  # 大端 short
-                #         timestamp = time.perf_counter()
-                #         frame = (ch1, ch2, ch3, timestamp+self.base_time)
-
-                #         # 如果队列满，丢弃最老的一帧（可选：也可阻塞）
-                #         if self.data_queue.full():
-                #             self.data_queue.get()
-                #         self.data_queue.put(frame)
-
-                #     except struct.error as e:
-                #         print(f"帧解析失败: {e}, 数据: {frame_data.hex()}")
-                #         continue
-
+                now = self.clock.now(self.device_name)
+                self.buffer.extend(data)
+                frames, consumed = self.parse_frames(self.buffer)
+                del self.buffer[:consumed]
+                if len(frames) == 0:
+                    continue
+                if self.data_queue.full():
+                    self.dropped += len(self.data_queue.get()[0])
+                self.data_queue.put((frames, self.interpolate_timestamps(len(frames), now)))
             except Exception as e:
                 print(f"读取线程异常: {e}")
                 time.sleep(0.001)
 
+    @classmethod
+    def parse_frames(cls, buffer) -> Tuple[np.ndarray, int]:
+        """
+        一次性解析 buffer 中所有完整帧。
+        :return: ((N,3) int16 数组, 已消费的字节数)
+        从帧头开始按 FRAME_SIZE 对齐校验后续帧头，连续的一段帧一次解码；
+        帧需由下一个对齐帧头确认，数据中的伪帧头和乱码前的残帧被丢弃，之后从下一个帧头重新同步。
+        """
+        arr = np.frombuffer(buffer, dtype=np.uint8)
+        n = len(arr)
+        is_header = (arr[:-1] == cls.FRAME_HEADER[0]) & (arr[1:] == cls.FRAME_HEADER[1])
+        candidates = np.flatnonzero(is_header)
+        segments = []
+        pos = 0
+        while True:
+            k = np.searchsorted(candidates, pos)
+            if k == len(candidates):
+                # 没有帧头，保留最后一个字节（可能是下一个帧头的前半）
+                pos = max(pos, n - 1)
+                break
+            start = int(candidates[k])
+            aligned_ok = is_header[start:n - 1:cls.FRAME_SIZE]
+            run = len(aligned_ok) if aligned_ok.all() else int(np.argmin(aligned_ok))
+            # 每帧都要由其后的对齐帧头确认，连续段的最后一帧不确认
+            good = run - 1
+            end = start + good * cls.FRAME_SIZE
+            if good > 0:
+                segments.append(arr[start:end].view(cls.FRAME_DTYPE)["ch"].astype(np.int16))
+            if run == len(aligned_ok):
+                # 一直连续到缓冲末尾，最后一帧等下一个帧头到达后再解析
+                pos = end
+                break
+            # 段后出现乱码，最后一帧不可信，从其帧头之后重新同步
+            pos = end + 1
+        if not segments:
+            return np.zeros((0, 3), dtype=np.int16), pos
+        return np.concatenate(segments), pos
+
+    def interpolate_timestamps(self, n, now) -> np.ndarray:
+        """按批插值时间戳：本批 n 个采样均匀分布在上一批结束到本次读取之间"""
+        prev = self.last_timestamp
+        if prev is None or now - prev > 2 * n / self.sample_rate:
+            # 首批或读取中断过，按标称采样率回推
+            prev = now - n / self.sample_rate
+        self.last_timestamp = now
+        return np.linspace(prev, now, n + 1)[1:]
+
+    def read_block(self, timeout: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        读取一批解析好的数据。
+        :return: ((N,3) int16 [ch1,ch2,ch3], (N,) float64 时间戳)
+        """
+        return self.data_queue.get(timeout=timeout)
+
     def read(self, len=4, timeout: Optional[float] = None) -> Optional[Tuple[int, int, int, float]]:
         """
-        从队列中读取一个帧数据。
+        兼容逐帧接口，从批数据中取出 len 个帧。
         :param timeout: 超时时间，None 表示无限等待
-        :return: (ch1, ch2, ch3, timestamp) 或 None（超时）
+        :return: [(ch1, ch2, ch3, timestamp), ...]
         """
-        return [self.data_queue.get(timeout=timeout) for _ in range(len)]
+        while self.pending_size() < len:
+            frames, timestamps = self.read_block(timeout=timeout)
+            self.pending.extend(zip(*frames.T.tolist(), timestamps.tolist()))
+        return [self.pending.popleft() for _ in range(len)]
+
+    def pending_size(self) -> int:
+        return len(self.pending)
 
     def read_batch(self, n: int, timeout: float = 1.0) -> list:
         """
@@ -122,7 +141,7 @@ class RppgCollector:
         return batch
 
     def qsize(self) -> int:
-        """返回当前队列中的帧数量"""
+        """返回当前队列中的批数量"""
         return self.data_queue.qsize()
 
     def close(self):
@@ -145,14 +164,12 @@ if __name__ == "__main__":
         cnt = 0
         start = time.time()
         while True:
-            frame = collector.read(len=6)  # 每次读一个帧
-            if frame is None:
-                continue
+            frames, timestamps = collector.read_block()  # 每次读一批
 
-            # ch1, ch2, ch3, timestamp = frame
-            # print(f"帧: {ch1}, {ch2}, {ch3}, 时间: {timestamp:.4f}")
+            # ch1, ch2, ch3 = frames[-1]
+            # print(f"帧: {ch1}, {ch2}, {ch3}, 时间: {timestamps[-1]:.4f}")
 
-            cnt += 6
+            cnt += len(frames)
             if time.time() - start > 1.0:
                 print(f"FPS: {cnt} fps")
                 cnt = 0
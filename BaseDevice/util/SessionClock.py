@@ -0,0 +1,56 @@
+import time
+
+
+class SessionClock:
+    """
+    会话时钟：启动时把单调高精度时钟（perf_counter）锚定到系统时间一次，
+    之后 now() 只读单调时钟，不受系统时间跳变和 NTP 校时影响，所有设备的时间戳可以直接比较。
+    返回值仍是以秒为单位的 Unix 时间戳，float64 在当前时间附近的分辨率约 0.2us，与已有数据格式一致。
+    perf_counter 是系统级时钟，多进程模式下子进程载入同一锚点即可得到一致的时间戳。
+    """
+    ANCHOR_SAMPLES = 50
+
+    def __init__(self):
+        self.offsets = {}  # 设备名 -> 加到该设备时间戳上的偏移（秒）
+        self.anchor()
+
+    def anchor(self):
+        """多次读取系统时间，取前后 perf_counter 间隔最小的一次作为锚点，锚定误差为该间隔的一半"""
+        best = None
+        for _ in range(self.ANCHOR_SAMPLES):
+            p0 = time.perf_counter()
+            wall = time.time()
+            p1 = time.perf_counter()
+            if best is None or p1 - p0 < best[0]:
+                best = (p1 - p0, wall, (p0 + p1) / 2)
+        self.uncertainty = best[0] / 2
+        self.wall_anchor = best[1]
+        self.perf_anchor = best[2]
+        self.base = self.wall_anchor - self.perf_anchor
+
+    def now(self, device_name=None) -> float:
+        """当前会话时间（Unix 秒），指定设备名时加上该设备的偏移"""
+        if device_name is None:
+            return time.perf_counter() + self.base
+        return time.perf_counter() + self.base + self.offsets.get(device_name, 0.0)
+
+    def set_offset(self, device_name, offset):
+        """设置设备时间戳偏移，如已知传输延迟 d 时设为 -d；需在设备开始采集前设置，多进程模式下随锚点传给子进程"""
+        self.offsets[device_name] = float(offset)
+
+    def state(self) -> dict:
+        """锚点信息，写入录制文件的元数据，也用于传给子进程"""
+        return {
+            "wall_anchor": self.wall_anchor,
+            "perf_anchor": self.perf_anchor,
+            "uncertainty": self.uncertainty,
+            "offsets": dict(self.offsets),
+        }
+
+    def load(self, state: dict):
+        """载入其他进程的锚点（原地修改，已持有本对象的采集线程同时生效）"""
+        self.wall_anchor = state["wall_anchor"]
+        self.perf_anchor = state["perf_anchor"]
+        self.uncertainty = state["uncertainty"]
+        self.offsets = dict(state["offsets"])
+        self.base = self.wall_anchor - self.perf_anchor
@@ -0,0 +1,361 @@
+import os
+import glob
+import struct
+import zipfile
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+from BaseDevice.util.FrameContainer import FrameContainerReader, FrameContainerWriter
+from BaseDevice.util.DepthCodec import DepthReader
+
+try:
+    import av
+except ImportError:
+    av = None
+
+VIDEO_CODECS = ("h264", "hevc")  # 按数据包保存、帧间预测的编码
+
+
+def list_device_files(device_dir) -> List[str]:
+    """设备目录下的录制文件（分块 npz 或帧容器 .bin），按起始时间戳排序"""
+    files = glob.glob(os.path.join(device_dir, "*.npz"))
+    files += glob.glob(os.path.join(device_dir, "*" + FrameContainerWriter.BLOB_SUFFIX))
+
+    def start_timestamp(path):
+        try:
+            return float(os.path.basename(path).split("f")[0])
+        except ValueError:
+            return float("inf")
+    return sorted(files, key=start_timestamp)
+
+
+def decode_image(codec, data) -> np.ndarray:
+    """按容器编码解码一帧图像，不支持逐帧解码的编码原样返回字节"""
+    if codec == "mjpeg":
+        # 早期 npz 中的帧可能是 |S 字节串，统一按字节视图解码
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = np.frombuffer(data, dtype=np.uint8)
+        return cv2.imdecode(np.asarray(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return data
+
+
+class NpzMembers:
+    """
+    以内存映射方式打开 npz：不压缩（np.savez / ChunkWriter 写出）的数组成员直接映射到文件中的数据区，
+    只读取 zip 目录和 .npy 头；压缩或 pickle 的成员在首次访问时才由 np.load 读取。
+    """
+    LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+    def __init__(self, path):
+        self.path = path
+        self.members = {}  # 名称 -> (偏移, 形状, dtype, fortran_order) 或 None（需 np.load 读取）
+        self.cache = {}
+        with open(path, "rb") as f, zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                if not info.filename.endswith(".npy"):
+                    continue
+                name = info.filename[:-4]
+                self.members[name] = self._locate(f, info) if info.compress_type == zipfile.ZIP_STORED else None
+
+    def _locate(self, f, info):
+        f.seek(info.header_offset)
+        header = self.LOCAL_HEADER.unpack(f.read(self.LOCAL_HEADER.size))
+        # 本地文件头之后是文件名和扩展字段，再之后才是数据
+        f.seek(info.header_offset + self.LOCAL_HEADER.size + header[-2] + header[-1])
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if dtype.hasobject:
+            return None
+        return f.tell(), shape, dtype, fortran_order
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def dtype(self, name) -> Optional[np.dtype]:
+        """不读取数据返回成员的 dtype，压缩或 pickle 的成员返回 None"""
+        location = self.members.get(name)
+        return location[2] if location is not None else None
+
+    def __getitem__(self, name) -> np.ndarray:
+        if name in self.cache:
+            return self.cache[name]
+        location = self.members[name]
+        if location is None:
+            with np.load(self.path, allow_pickle=True) as data:
+                value = data[name]
+        else:
+            offset, shape, dtype, fortran_order = location
+            if int(np.prod(shape, dtype=np.int64)) == 0:
+                value = np.empty(shape, dtype=dtype)
+            elif not shape:
+                # 标量（设备名、帧率等）直接读取，不建立映射
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    value = np.frombuffer(f.read(dtype.itemsize), dtype=dtype).reshape(())
+            else:
+                value = np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                                  order="F" if fortran_order else "C")
+        self.cache[name] = value
+        return value
+
+
+class NpzChunk:
+    """ChunkWriter 写出的一个分块（或早期整段保存的 npz）"""
+
+    def __init__(self, path):
+        self.data = NpzMembers(path)
+        # 早期 OpencvDevice 的文件使用 timestamp 键
+        self.timestamps = np.asarray(self.data["timestamps" if "timestamps" in self.data else "timestamp"])
+        self.frame_rate = self.data["frame_rate"].item() if "frame_rate" in self.data else None
+        self.meta_info = self.data["meta_info"].item() if "meta_info" in self.data else None
+        # 早期视频 npz 中每帧 JPEG 按最大长度补齐，frame_lens 为实际长度；
+        # FFmpegDevice/VideoDevice 的帧以 |S 字节串保存
+        self.frame_lens = self.data["frame_lens"] if "frame_lens" in self.data else None
+        frames_dtype = self.data.dtype("frames")
+        is_bytes = frames_dtype is not None and frames_dtype.kind == "S"
+        self.codec = "mjpeg" if self.frame_lens is not None or is_bytes else None
+        reserved = ("device_name", "frame_rate", "chunk_index", "timestamps", "timestamp",
+                    "frames", "meta_info", "frame_lens")
+        self.field_names = [name for name in self.data.members if name not in reserved]
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self.data["frames"]
+
+    def field(self, name) -> np.ndarray:
+        return self.data[name]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def raw(self, i):
+        if self.frame_lens is None:
+            return self.frames[i]
+        return self.frames[i][:int(self.frame_lens[i])]
+
+    def __getitem__(self, i):
+        if self.codec is None:
+            return self.frames[i]
+        return decode_image(self.codec, self.raw(i))
+
+
+class PacketVideoReader:
+    """
+    读取按数据包保存的 H.264/HEVC 帧容器（FFmpegDevice 实时压缩模式），需要 PyAV。
+    顺序读取时复用解码器，随机访问或向前跳过关键帧时从之前最近的关键帧重新解码。
+    """
+
+    def __init__(self, reader: FrameContainerReader):
+        if av is None:
+            raise ImportError("解码 H.264/HEVC 需要安装 PyAV（pip install av）")
+        self.reader = reader
+        extradata = (reader.meta.get("codec_info") or {}).get("extradata")
+        self.extradata = bytes.fromhex(extradata) if extradata else None
+        index = reader.index
+        self.keyframes = np.flatnonzero(index["keyframe"]) if "keyframe" in index.dtype.names else np.array([0])
+        self.decoder = None
+        self.fed = 0  # 下一个送入解码器的数据包
+        self.decoded = -1  # 已输出的最后一帧帧号
+        self.last = (-1, None)
+
+    def _restart(self, start):
+        self.decoder = av.CodecContext.create(self.reader.codec, "r")
+        if self.extradata:
+            self.decoder.extradata = self.extradata
+        self.fed = start
+        self.decoded = start - 1
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, i) -> np.ndarray:
+        i = range(len(self))[i]
+        if self.last[0] == i:
+            return self.last[1]
+        k = np.searchsorted(self.keyframes, i, "right") - 1
+        keyframe = int(self.keyframes[k]) if k >= 0 else 0
+        if self.decoder is None or i <= self.decoded or keyframe > self.fed:
+            self._restart(keyframe)
+        image = None
+        while self.decoded < i:
+            if self.fed < len(self.reader):
+                frames = self.decoder.decode(av.Packet(bytes(self.reader[self.fed])))
+                self.fed += 1
+            else:
+                # 数据包已送完，取出解码器中缓存的帧，之后需重新开始
+                frames = self.decoder.decode(None)
+                self.decoder = None
+                if self.decoded + len(frames) < i:
+                    raise IndexError(f"第 {i} 帧无法解码")
+            for frame in frames:
+                self.decoded += 1
+                if self.decoded == i:
+                    image = frame.to_ndarray(format="bgr24")
+        self.last = (i, image)
+        return image
+
+
+class ContainerChunk:
+    """帧容器文件，depth-* 编码用 DepthReader 解码，h264/hevc 用 PacketVideoReader，mjpeg 用 cv2 解码"""
+
+    def __init__(self, path, orient=False):
+        self.reader = FrameContainerReader(path)
+        self.codec = self.reader.codec
+        self.depth = DepthReader(path, orient) if self.codec.startswith("depth-") else None
+        self.video = PacketVideoReader(self.reader) if self.codec in VIDEO_CODECS else None
+        self.timestamps = self.reader.timestamps
+        self.frame_rate = self.reader.frame_rate
+        self.meta_info = self.reader.meta_info
+        self.field_names = [name for name in self.reader.index.dtype.names
+                            if name not in ("offset", "length", "timestamp")]
+
+    def field(self, name) -> np.ndarray:
+        return self.reader.index[name]
+
+    def __len__(self):
+        return len(self.reader)
+
+    def raw(self, i):
+        return self.reader[i]
+
+    def __getitem__(self, i):
+        if self.depth is not None:
+            return self.depth[i]
+        if self.video is not None:
+            return self.video[i]
+        return decode_image(self.codec, self.reader[i])
+
+
+class DeviceSequence:
+    """
+    一个设备目录下所有录制文件拼成的只读序列，按帧号或时间戳随机访问。
+    打开时只读取时间戳和索引，帧数据保持内存映射，访问某一帧时才读取并解码。
+    orient=True 时按元数据中的 horizontal_flip 翻转深度图（与 DepthReader 一致）。
+    """
+
+    def __init__(self, device_dir, orient=False):
+        self.device_dir = device_dir
+        self.device_name = os.path.basename(os.path.normpath(device_dir))
+        self.files = list_device_files(device_dir)
+        self.chunks = [ContainerChunk(f, orient) if f.endswith(FrameContainerWriter.BLOB_SUFFIX) else NpzChunk(f)
+                       for f in self.files]
+        self.chunks = [chunk for chunk in self.chunks if len(chunk)]
+        lengths = [len(chunk) for chunk in self.chunks]
+        self.starts = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.timestamps = (np.concatenate([chunk.timestamps for chunk in self.chunks])
+                           if self.chunks else np.zeros(0, dtype=np.float64))
+        first = self.chunks[0] if self.chunks else None
+        self.frame_rate = first.frame_rate if first else None
+        self.meta_info = first.meta_info if first else None
+        self.codec = first.codec if first else None
+        self.fields = {}
+
+    @property
+    def is_video(self) -> bool:
+        """帧为编码后的字节（视频、深度图容器）而不是数值数组"""
+        return self.codec is not None
+
+    def field(self, name) -> Optional[np.ndarray]:
+        """逐帧附加字段（如 frame_counter、keyframe），所有文件都有该字段时返回拼接结果"""
+        if name not in self.fields:
+            if self.chunks and all(name in chunk.field_names for chunk in self.chunks):
+                self.fields[name] = np.concatenate([chunk.field(name) for chunk in self.chunks])
+            else:
+                self.fields[name] = None
+        return self.fields[name]
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def locate(self, i):
+        """全局帧号 -> (分块, 分块内帧号)"""
+        i = range(len(self))[i]
+        k = int(np.searchsorted(self.starts, i, "right")) - 1
+        return self.chunks[k], i - int(self.starts[k])
+
+    def __getitem__(self, i):
+        """单个帧号返回一帧（按需解码），切片返回帧的列表"""
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        chunk, j = self.locate(i)
+        return chunk[j]
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            for j in range(len(chunk)):
+                yield chunk[j]
+
+    def raw(self, i):
+        """第 i 帧的原始存储（编码字节或数值帧），不解码"""
+        chunk, j = self.locate(i)
+        return chunk.raw(j)
+
+    def index_at(self, timestamp) -> int:
+        """与 timestamp 最近的帧号"""
+        t = self.timestamps
+        right = int(np.clip(np.searchsorted(t, timestamp), 1, len(t) - 1))
+        return right - 1 if timestamp - t[right - 1] <= t[right] - timestamp else right
+
+    def at(self, timestamp):
+        """与 timestamp 最近的一帧"""
+        return self[self.index_at(timestamp)]
+
+    def between(self, start, end) -> range:
+        """时间戳在 [start, end) 内的帧号范围"""
+        return range(int(np.searchsorted(self.timestamps, start)), int(np.searchsorted(self.timestamps, end)))
+
+    def array(self, start=0, stop=None) -> np.ndarray:
+        """数值型设备 [start, stop) 的帧拼成一个数组，只读取涉及的分块"""
+        if self.is_video:
+            raise ValueError(f"[{self.device_name}] 编码帧不能直接拼接为数组")
+        start, stop, _ = slice(start, stop).indices(len(self))
+        parts = []
+        for k, chunk in enumerate(self.chunks):
+            lo, hi = max(start, self.starts[k]), min(stop, self.starts[k + 1])
+            if lo < hi:
+                parts.append(chunk.frames[lo - self.starts[k]:hi - self.starts[k]])
+        if not parts:
+            return np.zeros(0)
+        return np.array(parts[0]) if len(parts) == 1 else np.concatenate(parts)
+
+
+class SessionReader:
+    """
+    打开一次录制（save_floder 目录），每个设备目录对应一个 DeviceSequence，首次访问时才打开。
+        session = SessionReader(path)
+        cam = session["Logitech_cam"]
+        image = cam[100]            # 第 100 帧，访问时解码
+        image = cam.at(t)           # 与时间戳 t 最近的一帧
+        ppg = session["ppg"].array()
+    """
+
+    def __init__(self, session_dir, orient=False):
+        self.session_dir = session_dir
+        self.orient = orient
+        self.devices = [name for name in sorted(os.listdir(session_dir))
+                        if os.path.isdir(os.path.join(session_dir, name))
+                        and list_device_files(os.path.join(session_dir, name))]
+        self.sequences: Dict[str, DeviceSequence] = {}
+
+    def __contains__(self, name):
+        return name in self.devices
+
+    def __getitem__(self, name) -> DeviceSequence:
+        if name not in self.devices:
+            raise KeyError(name)
+        if name not in self.sequences:
+            self.sequences[name] = DeviceSequence(os.path.join(self.session_dir, name), self.orient)
+        return self.sequences[name]
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def __len__(self):
+        return len(self.devices)
+
+    def items(self):
+        for name in self.devices:
+            yield name, self[name]
@@ -0,0 +1,182 @@
+import os
+import numpy as np
+from typing import Dict, Optional
+from BaseDevice.util.SessionReader import DeviceSequence, SessionReader
+
+
+def median_filter(x: np.ndarray, window) -> np.ndarray:
+    """一维滑动中值滤波，两端按边缘值延拓"""
+    if len(x) < window:
+        return np.full_like(x, np.median(x))
+    half = window // 2
+    padded = np.concatenate([np.full(half, x[0]), x, np.full(half, x[-1])])
+    windows = np.lib.stride_tricks.as_strided(
+        padded, shape=(len(x), window), strides=(padded.strides[0], padded.strides[0]))
+    return np.median(windows, axis=1)
+
+
+class DeviceTimeline:
+    """
+    单个设备的时间轴与时钟模型。
+    主机时间戳 = 采集时刻 + 传输延迟 + 抖动，采集时刻按帧号线性：t = a + b*i。
+    先由中位帧间隔恢复帧号（丢帧处帧号跳变），最小二乘拟合 a、b，
+    再取残差的下包络（envelope 分位数）作为最小传输延迟对应的时刻，得到去抖动后的时间戳。
+    """
+
+    MEDIAN_WINDOW = 9
+
+    def __init__(self, device_name, timestamps, frame_rate, files=None, is_video=False, frame_counter=None,
+                 sequence: DeviceSequence = None, clock_offset=0.0):
+        self.device_name = device_name
+        self.sequence = sequence  # 帧数据的只读序列，插值导出时才读取
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.frame_rate = frame_rate
+        self.files = files or []
+        self.is_video = is_video
+        self.frame_counter = frame_counter  # 设备硬件帧计数（如 UWB），有则直接作为帧号
+        self.clock_offset = clock_offset  # 采集时会话时钟已加到时间戳上的偏移（元数据 clock.offsets）
+        self.corrected = self.timestamps
+        self.frame_index = np.arange(len(self.timestamps))
+        self.period = 1.0 / frame_rate if frame_rate else 0.0
+        self.offset = 0.0
+        self.jitter = 0.0
+        self.latency_spread = 0.0
+        self.dropped = 0
+
+    def fit(self, latency=0.0, offset=0.0, envelope=0.01):
+        """
+        :param latency: 已知的固定传输延迟（秒），从时间戳中扣除
+        :param offset: 已知的设备时钟偏移（秒），从时间戳中扣除；
+                       采集时设置的 clock_offset 已包含在时间戳中，这里只填额外的偏移，不要重复计入
+        :param envelope: 下包络分位数
+        """
+        t = self.timestamps
+        if len(t) < 3:
+            self.corrected = t - latency - offset
+            return self
+        if self.frame_counter is not None:
+            # 硬件帧计数为 uint32，按差值累加处理回绕
+            step = np.diff(self.frame_counter.astype(np.int64)) % (1 << 32)
+            index = np.concatenate([[0], np.cumsum(step)]).astype(np.float64)
+        else:
+            # 去趋势后做中值滤波：单帧抖动被滤除，丢帧表现为持续的台阶，台阶高度即丢帧数
+            period = np.median(np.diff(t))
+            order = np.arange(len(t))
+            level = median_filter(t - order * period, self.MEDIAN_WINDOW)
+            step = np.maximum(0, np.round(np.diff(level) / period))
+            index = order + np.concatenate([[0], np.cumsum(step)])
+        b, a = np.polyfit(index, t, 1)
+        residual = t - (a + b * index)
+        floor = np.quantile(residual, envelope)
+        self.frame_index = index.astype(np.int64)
+        self.period = b
+        self.jitter = float(np.std(residual))
+        self.latency_spread = float(np.median(residual) - floor)
+        self.dropped = int(index[-1] + 1 - len(t))
+        self.offset = float(floor - latency - offset)
+        self.corrected = a + b * index + self.offset
+        return self
+
+    @property
+    def start(self):
+        return self.corrected[0]
+
+    @property
+    def end(self):
+        return self.corrected[-1]
+
+    def nearest_index(self, grid, max_gap=None) -> np.ndarray:
+        """grid 上每个时刻最近的帧号，距离超过 max_gap（默认 1.5 帧间隔）的记为 -1"""
+        t = self.corrected
+        right = np.clip(np.searchsorted(t, grid), 1, len(t) - 1)
+        left = right - 1
+        index = np.where(grid - t[left] <= t[right] - grid, left, right)
+        max_gap = 1.5 * self.period if max_gap is None else max_gap
+        index[np.abs(t[index] - grid) > max_gap] = -1
+        return index
+
+    def resample(self, data, grid) -> np.ndarray:
+        """沿第0维把 data 线性插值到 grid 上，整数类型输出 float32"""
+        position = np.interp(grid, self.corrected, np.arange(len(self.corrected)))
+        i0 = np.minimum(position.astype(np.int64), len(self.corrected) - 2)
+        w = (position - i0).reshape((-1,) + (1,) * (data.ndim - 1))
+        if not np.issubdtype(data.dtype, np.inexact):
+            data = data.astype(np.float32)
+            w = w.astype(np.float32)
+        return data[i0] * (1 - w) + data[i0 + 1] * w
+
+    def load_data(self) -> Optional[np.ndarray]:
+        """读取数值型设备的全部帧（视频类返回 None，只导出索引）"""
+        if self.is_video or self.sequence is None:
+            return None
+        return self.sequence.array()
+
+    def report(self) -> dict:
+        return {
+            "frames": len(self.timestamps),
+            "nominal_rate": self.frame_rate,
+            "fitted_rate": 1.0 / self.period if self.period else 0.0,
+            "offset": self.offset,
+            "clock_offset": self.clock_offset,
+            "jitter": self.jitter,
+            "latency_spread": self.latency_spread,
+            "dropped": self.dropped,
+        }
+
+
+def load_timeline(device_dir) -> Optional[DeviceTimeline]:
+    """读取一个设备目录下所有文件的时间戳（帧数据保持内存映射，不读取）"""
+    return timeline_from_sequence(DeviceSequence(device_dir))
+
+
+def timeline_from_sequence(sequence: DeviceSequence) -> Optional[DeviceTimeline]:
+    if not len(sequence):
+        return None
+    clock = (sequence.meta_info or {}).get("clock") or {}
+    clock_offset = clock.get("offsets", {}).get(sequence.device_name, 0.0)
+    return DeviceTimeline(sequence.device_name, sequence.timestamps, sequence.frame_rate, files=sequence.files,
+                          is_video=sequence.is_video, frame_counter=sequence.field("frame_counter"),
+                          sequence=sequence, clock_offset=clock_offset)
+
+
+def load_session(session_dir) -> Dict[str, DeviceTimeline]:
+    """读取 save_floder 下每个设备目录的时间轴"""
+    timelines = {}
+    for name, sequence in SessionReader(session_dir).items():
+        timeline = timeline_from_sequence(sequence)
+        if timeline is not None:
+            timelines[name] = timeline
+    return timelines
+
+
+def make_grid(timelines: Dict[str, DeviceTimeline], rate=None, reference=None) -> np.ndarray:
+    """
+    在所有设备的公共时间范围内生成统一时间轴：
+    reference 指定设备时直接使用该设备（如视频）的去抖动时间戳，否则按 rate 等间隔采样。
+    """
+    start = max(t.start for t in timelines.values())
+    end = min(t.end for t in timelines.values())
+    if end <= start:
+        raise ValueError("设备之间没有重叠的时间范围")
+    if reference is not None:
+        t = timelines[reference].corrected
+        return t[(t >= start) & (t <= end)]
+    return np.arange(start, end, 1.0 / rate)
+
+
+def export_aligned(timelines: Dict[str, DeviceTimeline], grid, filename, resample=()):
+    """
+    导出同步结果：每个设备的 <name>_index（grid 上最近帧号，-1 为缺失），
+    resample 中的数值型设备额外导出插值到 grid 上的 <name>_data。
+    """
+    arrays = {"grid": grid}
+    for name, timeline in timelines.items():
+        arrays[f"{name}_index"] = timeline.nearest_index(grid)
+        if name in resample:
+            data = timeline.load_data()
+            if data is None:
+                print(f"[{name}] 视频类设备不支持插值，只导出索引")
+                continue
+            arrays[f"{name}_data"] = timeline.resample(data, grid)
+    np.savez(filename, **arrays)
+    return arrays
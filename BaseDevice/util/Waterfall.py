@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class Waterfall:
+    """
+    滚动瀑布图（如 UWB 距离-时间图），按预览尺寸保存为 uint8 环形图像，横轴为时间，纵轴为距离单元。
+    每列对应 window/width 帧，取这些帧的最大幅值；新数据只渲染新的列：
+    纵向按预计算的线性插值权重缩放到图像高度，归一化使用随时间衰减的最小/最大值，伽马校正查表完成。
+    取图时只按环形顺序拼接一次，代价与窗口帧数无关。
+    """
+    LUT_SIZE = 1024
+
+    def __init__(self, window, width=560, height=420, gamma=0.5, decay=0.995):
+        """
+        :param window: 图像覆盖的帧数
+        :param decay: 每帧的最小/最大值衰减系数，越接近 1 归一化越稳定
+        """
+        self.width = width
+        self.height = height
+        self.frames_per_column = window / width
+        self.decay = decay
+        self.lut = (np.linspace(0, 1, self.LUT_SIZE) ** gamma * 255).astype(np.uint8)
+        self.image = np.zeros((height, width), dtype=np.uint8)
+        self.frames = 0  # 累计帧数
+        self.last_column = -1  # 最新一列的序号
+        self.pending = None  # 最新一列（可能还未凑满帧）的最大幅值
+        self.lo = None
+        self.hi = None
+        self.rows = None
+
+    def _row_weights(self, bins):
+        """与 cv2.INTER_LINEAR 相同的纵向插值位置和权重"""
+        src = np.clip((np.arange(self.height) + 0.5) * bins / self.height - 0.5, 0, bins - 1)
+        i0 = np.minimum(src.astype(np.int64), bins - 2) if bins > 1 else np.zeros(self.height, np.int64)
+        w = (src - i0).astype(np.float32)
+        self.rows = (i0, np.minimum(i0 + 1, bins - 1), w)
+
+    def push(self, magnitude: np.ndarray):
+        """追加一批按时间顺序的幅值帧 (n, bins)，只渲染受影响的列"""
+        n = len(magnitude)
+        if n == 0:
+            return
+        if self.rows is None:
+            self._row_weights(magnitude.shape[1])
+        columns = ((self.frames + np.arange(n)) // self.frames_per_column).astype(np.int64)
+        self.frames += n
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(columns)) + 1])
+        peaks = np.maximum.reduceat(magnitude, starts, axis=0)
+        ids = columns[starts]
+        if self.pending is not None and ids[0] == self.last_column:
+            peaks[0] = np.maximum(peaks[0], self.pending)
+        self.pending = peaks[-1].copy()
+        self.last_column = ids[-1]
+        self._update_range(magnitude, n)
+        self._render(peaks, ids)
+
+    def _update_range(self, magnitude, n):
+        lo, hi = float(magnitude.min()), float(magnitude.max())
+        if self.lo is None:
+            self.lo, self.hi = lo, hi
+            return
+        decay = self.decay ** n
+        self.lo = min(lo, self.lo * decay + lo * (1 - decay))
+        self.hi = max(hi, self.hi * decay + hi * (1 - decay))
+
+    def _render(self, peaks, ids):
+        i0, i1, w = self.rows
+        values = peaks[:, i0] * (1 - w) + peaks[:, i1] * w
+        scale = (self.LUT_SIZE - 1) / max(self.hi - self.lo, 1e-12)
+        index = np.clip((values - self.lo) * scale, 0, self.LUT_SIZE - 1).astype(np.int64)
+        self.image[:, ids % self.width] = self.lut[index].T
+
+    def get_image(self) -> np.ndarray:
+        """返回 (height, width) uint8 图像，最新的列在最右侧"""
+        start = (self.last_column + 1) % self.width
+        return np.concatenate((self.image[:, start:], self.image[:, :start]), axis=1)
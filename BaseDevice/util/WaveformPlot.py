@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+
+class WaveformPlot:
+    """
+    多通道波形预览，最近 window 个样本保存在预分配的环形缓冲中。
+    y 坐标向量化计算，每个通道只调用一次 cv2.polylines；
+    样本数多于像素列时按列取最小/最大值（每列一段竖线），降采样不会丢掉峰值。
+    scroll=True 时画布随新数据左移，只绘制新增的列，数据超出当前纵向刻度时才整幅重绘。
+    """
+    MARGIN = 0.1  # 上下留白比例
+    HEADROOM = 0.2  # 滚动模式下刻度额外放宽的比例，避免频繁重绘
+    COLORS = [(0, 255, 0), (0, 0, 255), (255, 0, 0)]
+
+    def __init__(self, channels, window, width=560, height=420, labels=None, downsample=True, scroll=False):
+        self.channels = channels
+        self.window = window
+        self.width = width
+        self.height = height
+        self.labels = labels or [f"CH{i + 1}" for i in range(channels)]
+        self.downsample = downsample and window > width
+        self.scroll = scroll
+        self.data = np.zeros((window, channels), dtype=np.float32)
+        self.total = 0  # 累计样本数
+        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self.drawn = 0  # 画布上已绘制的列数（累计）
+        self.lo = None
+        self.hi = None
+
+    def push(self, samples):
+        """追加 (n, channels) 样本"""
+        samples = np.asarray(samples).reshape(-1, self.channels)[-self.window:]
+        n = len(samples)
+        i = self.total % self.window
+        first = min(n, self.window - i)
+        self.data[i:i + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.total += n
+
+    def _first_sample(self, column):
+        """第 column 列的第一个样本序号"""
+        return -(-column * self.window // self.width)
+
+    def _samples(self, start, end):
+        """环形缓冲中累计序号 [start, end) 的样本，早于缓冲窗口的部分截掉"""
+        start = max(start, self.total - self.window, 0)
+        index = np.arange(start, max(start, end))
+        i = start % self.window
+        j = i + len(index)
+        if j <= self.window:
+            return index, self.data[i:j]
+        return index, np.concatenate((self.data[i:], self.data[:j - self.window]))
+
+    def _set_range(self, values, headroom=0.0):
+        lo, hi = values.min(axis=0), values.max(axis=0)
+        span = np.maximum(hi - lo, 1)  # 防止除零
+        self.lo = lo - span * headroom / 2
+        self.hi = hi + span * headroom / 2
+
+    def _draw(self, col_start, col_end, x0):
+        """绘制 [col_start, col_end) 列，画布横坐标为 列号 - x0"""
+        index, values = self._samples(self._first_sample(max(col_start, 0)), self._first_sample(col_end))
+        if len(index) == 0:
+            return
+        scale = self.height * (1 - 2 * self.MARGIN) / np.maximum(self.hi - self.lo, 1)
+        y = (self.height * (1 - self.MARGIN) - (values - self.lo) * scale).astype(np.int32)
+        if self.downsample:
+            columns = index * self.width // self.window
+            starts = np.concatenate([[0], np.flatnonzero(np.diff(columns)) + 1])
+            x = np.repeat(columns[starts] - x0, 2)
+            y_min = np.minimum.reduceat(y, starts, axis=0)
+            y_max = np.maximum.reduceat(y, starts, axis=0)
+            y = np.stack((y_min, y_max), axis=1).reshape(-1, self.channels)
+        else:
+            x = -(-index * self.width // self.window) - x0
+        x = x.astype(np.int32)
+        for ch in range(self.channels):
+            points = np.stack((x, y[:, ch]), axis=1).reshape(-1, 1, 2)
+            cv2.polylines(self.canvas, [points], False, self.COLORS[ch % len(self.COLORS)], 1)
+
+    def render(self) -> np.ndarray:
+        """返回 (height, width, 3) BGR 图像，最新数据在最右侧"""
+        columns = self.total * self.width // self.window  # 样本已到齐的列数
+        x0 = columns - self.width
+        if columns > 0:
+            if not self.scroll:
+                self._set_range(self._samples(0, self.total)[1])
+                self.canvas[:] = 0
+                self._draw(x0, columns, x0)
+            else:
+                self._render_scroll(columns, x0)
+            self.drawn = columns
+        img = self.canvas.copy()
+        for ch, label in enumerate(self.labels):
+            cv2.putText(img, label, (10, 30 * (ch + 1)), cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                        self.COLORS[ch % len(self.COLORS)], 2)
+        return img
+
+    def _render_scroll(self, columns, x0):
+        new = columns - self.drawn
+        if new <= 0:
+            return
+        values = self._samples(self._first_sample(self.drawn), self.total)[1]
+        if self.lo is None or new >= self.width or (values < self.lo).any() or (values > self.hi).any():
+            self._set_range(self._samples(0, self.total)[1], self.HEADROOM)
+            self.canvas[:] = 0
+            self._draw(x0, columns, x0)
+            return
+        self.canvas[:, :-new] = self.canvas[:, new:]
+        self.canvas[:, -new:] = 0
+        # 从上一列开始画，与已有曲线相连
+        self._draw(self.drawn - 1, columns, x0)
@@ -23,6 +23,9 @@ class xep():
 
     def __init__(self, device_name):
 
+        self.block = None
+        self.block_target = None
+
         self.reset(device_name)
         self.mc = pymoduleconnector.ModuleConnector(device_name)
 
@@ -101,6 +104,47 @@ class xep():
     def stop_streaming(self):
         self.xep.x4driver_set_fps(0)
 
+    def read_frames(self):
+        """Gets all queued frames from module without discarding any
+
+        Returns (frames, frame_counters) with one row per frame in arrival order,
+        or None if no frame is queued. Gaps in frame_counters mean frames were
+        lost before reaching the host.
+
+        frames is complex64 (float32 if downconversion is disabled) and is a view
+        of a reusable block: it is only valid until the next call, copy it if it
+        has to be kept.
+        """
+        count = self.xep.peek_message_data_float()
+        if not count:
+            return None
+
+        frame_counters = np.empty(count, dtype=np.uint32)
+        for i in range(count):
+            d = self.xep.read_message_data_float()
+            if i == 0:
+                target = self._frame_block(count, len(d.data))
+            # convert straight to float32 (no float64 temporary), then scatter the
+            # I/Q halves into the interleaved complex64 layout
+            np.copyto(target[i], np.asarray(d.data, dtype=np.float32).reshape(target.shape[1:]))
+            frame_counters[i] = d.frame_counter
+
+        return self.block[:count], frame_counters
+
+    def _frame_block(self, count, n):
+        """Preallocated output block, grown when more frames are queued than fit"""
+        bins = n // 2 if self.baseband else n
+        if self.block is None or len(self.block) < count or self.block.shape[1] != bins:
+            size = max(count, 2 * len(self.block) if self.block is not None else 0)
+            if self.baseband:
+                self.block = np.empty((size, bins), dtype=np.complex64)
+                # float32 view (frame, I/Q, bin) of the interleaved complex samples
+                self.block_target = self.block.view(np.float32).reshape(size, bins, 2).transpose(0, 2, 1)
+            else:
+                self.block = np.empty((size, bins), dtype=np.float32)
+                self.block_target = self.block.reshape(size, 1, bins)
+        return self.block_target
+
     def read_frame(self):
         """Gets frame data from module"""
         
@@ -0,0 +1,57 @@
+"""
+离线时间同步：读取一次录制（save_floder，如 ./data/user/state）下所有设备的时间戳，
+估计各设备的帧率、时钟偏移和抖动，导出统一时间轴上的帧号映射或插值后的数据。
+
+python align_session.py ./data/user/state --rate 30 --resample ppg uwb
+python align_session.py ./data/user/state --reference camera0 --latency camera0=0.05 -o aligned.npz
+"""
+import os
+import argparse
+from BaseDevice.util.TimeAlign import load_session, make_grid, export_aligned
+
+
+def parse_seconds(items):
+    """把 name=秒 形式的参数解析为字典"""
+    result = {}
+    for item in items or []:
+        name, value = item.split("=")
+        result[name] = float(value)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多设备录制数据离线时间同步")
+    parser.add_argument("session", help="录制目录，其下每个子目录为一个设备")
+    parser.add_argument("--rate", type=float, default=30, help="统一时间轴采样率（Hz）")
+    parser.add_argument("--reference", help="以该设备的去抖动时间戳作为统一时间轴（如摄像头）")
+    parser.add_argument("--resample", nargs="*", default=[], help="需要插值导出数据的数值型设备")
+    parser.add_argument("--latency", nargs="*", help="已知传输延迟，格式 设备名=秒")
+    parser.add_argument("--offset", nargs="*", help="额外的时钟偏移，格式 设备名=秒（采集时 CLOCK_OFFSETS 设置的偏移已在时间戳中）")
+    parser.add_argument("-o", "--output", help="输出文件，默认 <session>/aligned.npz")
+    args = parser.parse_args()
+
+    latency = parse_seconds(args.latency)
+    offset = parse_seconds(args.offset)
+    timelines = load_session(args.session)
+    if not timelines:
+        print(f"{args.session} 下没有找到录制数据")
+        return
+    for name, timeline in timelines.items():
+        timeline.fit(latency=latency.get(name, 0.0), offset=offset.get(name, 0.0))
+        report = timeline.report()
+        print(f"[{name}] {report['frames']}帧，标称{report['nominal_rate']}Hz，拟合{report['fitted_rate']:.3f}Hz，"
+              f"偏移{report['offset'] * 1000:.2f}ms（采集时已加{report['clock_offset'] * 1000:.2f}ms），抖动{report['jitter'] * 1000:.2f}ms，"
+              f"延迟波动{report['latency_spread'] * 1000:.2f}ms，丢帧{report['dropped']}")
+
+    grid = make_grid(timelines, rate=args.rate, reference=args.reference)
+    output = args.output or os.path.join(args.session, "aligned.npz")
+    arrays = export_aligned(timelines, grid, output, resample=args.resample)
+    print(f"统一时间轴 {len(grid)} 点，{grid[0]:.3f} - {grid[-1]:.3f}")
+    for name in timelines:
+        index = arrays[f"{name}_index"]
+        print(f"[{name}] 有效 {(index >= 0).sum()}/{len(index)}")
+    print(f"已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
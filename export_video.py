@@ -0,0 +1,283 @@
+"""
+批量导出录制的摄像头/深度数据：多进程并行解码，导出为图片序列，或经 PyAV 重新编码为 H.264 MP4（按时间戳设置 PTS）。
+中断后重新运行同一命令会跳过已完成的图片或视频分段。
+--copy 时不解码也不重新编码，把 MJPEG 帧原样封装进 MKV/AVI（PTS 取自时间戳），速度只受磁盘限制。
+
+python export_video.py ./data/user/state/Logitech_cam -o ./export/cam --format jpg
+python export_video.py ./data/user/state/orbbec_depth -o ./export/depth --orient   # 16 位深度图默认导出 16 位 png
+python export_video.py ./data/user/state/Logitech_cam -o cam.mp4 --crop 320 0 1280 1080 --resize 640 540 --segment 1800
+python export_video.py ./data/user/state/Logitech_cam -o cam.mkv --copy
+"""
+import os
+import time
+import argparse
+import cv2
+import numpy as np
+from fractions import Fraction
+from multiprocessing import Pool
+from BaseDevice.util.SessionReader import DeviceSequence
+
+try:
+    import av
+except ImportError:
+    av = None
+
+PTS_TIME_BASE = Fraction(1, 1000)  # 视频 PTS 以毫秒为单位，保留实际帧间隔
+VIDEO_FORMATS = {".mp4": "mp4", ".mkv": "matroska", ".avi": "avi"}
+HIGH_DEPTH_FORMATS = ("png", "tif", "tiff")  # 可保存 16 位图像的图片格式
+
+_sequence = None
+_options = None
+
+
+def _init_worker(device_dir, options):
+    global _sequence, _options
+    cv2.setNumThreads(1)  # 并行由进程池负责，避免每个进程再开满线程
+    _sequence = DeviceSequence(device_dir, orient=options["orient"])
+    _options = options
+
+
+def transform(image, crop=None, resize=None) -> np.ndarray:
+    """裁剪 (x, y, w, h) 后缩放到 (w, h)"""
+    if crop:
+        x, y, w, h = crop
+        image = image[y:y + h, x:x + w]
+    if resize:
+        image = cv2.resize(image, tuple(resize), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def to_bgr8(image) -> np.ndarray:
+    """视频编码需要 8 位 BGR，深度/红外等 16 位单通道图归一化后转换"""
+    if image.dtype != np.uint8:
+        image = cv2.normalize(image, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return np.ascontiguousarray(image)
+
+
+def _load(i) -> np.ndarray:
+    return transform(_sequence[i], _options["crop"], _options["resize"])
+
+
+def _decode_batch(indices):
+    """视频模式：解码一批帧返回主进程编码"""
+    return [to_bgr8(_load(i)) for i in indices]
+
+
+def _export_batch(indices):
+    """图片模式：解码一批帧直接写文件，先写临时文件再重命名，中断时不会留下不完整的图片"""
+    for i in indices:
+        filename = image_name(_options["output"], i, _options["format"])
+        tmp_filename = filename[:-len(_options["format"])] + "part." + _options["format"]
+        image = _load(i)
+        if image.dtype != np.uint8 and _options["format"] not in HIGH_DEPTH_FORMATS:
+            # jpg 等 8 位格式直接写 16 位图会被截断为 255，与视频导出一样先归一化
+            image = to_bgr8(image)
+        cv2.imwrite(tmp_filename, image, _options["params"])
+        os.replace(tmp_filename, filename)
+    return len(indices)
+
+
+def image_name(folder, i, ext):
+    return os.path.join(folder, f"{i:06d}.{ext}")
+
+
+def batches(indices, size):
+    for k in range(0, len(indices), size):
+        yield indices[k:k + size]
+
+
+class Progress:
+    """吞吐量与剩余时间报告"""
+    INTERVAL = 2.0
+
+    def __init__(self, name, total):
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.start = time.time()
+        self.last = self.start
+
+    def update(self, n):
+        self.done += n
+        now = time.time()
+        if now - self.last >= self.INTERVAL or self.done == self.total:
+            self.last = now
+            fps = self.done / max(now - self.start, 1e-6)
+            eta = (self.total - self.done) / fps if fps > 0 else 0
+            print(f"[{self.name}] {self.done}/{self.total}帧，{fps:.1f}fps，剩余约{eta:.0f}s")
+
+    def summary(self):
+        elapsed = max(time.time() - self.start, 1e-6)
+        print(f"[{self.name}] 完成 {self.done}帧，耗时{elapsed:.1f}s，平均{self.done / elapsed:.1f}fps")
+
+
+def export_images(sequence: DeviceSequence, pool, options, batch_size):
+    os.makedirs(options["output"], exist_ok=True)
+    existing = set(os.listdir(options["output"]))
+    todo = [i for i in range(len(sequence)) if f"{i:06d}.{options['format']}" not in existing]
+    if len(todo) < len(sequence):
+        print(f"[{sequence.device_name}] 跳过已导出的 {len(sequence) - len(todo)} 帧")
+    progress = Progress(sequence.device_name, len(todo))
+    for n in pool.imap_unordered(_export_batch, batches(todo, batch_size)):
+        progress.update(n)
+    progress.summary()
+
+
+def frame_pts(timestamps) -> np.ndarray:
+    """时间戳转为从 0 开始、严格递增的毫秒 PTS"""
+    pts = np.round((timestamps - timestamps[0]) / float(PTS_TIME_BASE)).astype(np.int64)
+    # 时间戳重复或回退时顺延 1 个单位，保证编码器接受
+    offset = np.arange(len(pts))
+    return np.maximum.accumulate(pts - offset) + offset
+
+
+def encode_segment(sequence: DeviceSequence, pool, indices, filename, options, batch_size, progress):
+    """把 indices 对应的帧编码为一个视频文件，写完后才从 .part 重命名为正式文件名"""
+    tmp_filename = filename + ".part"
+    container = av.open(tmp_filename, "w", format=VIDEO_FORMATS[os.path.splitext(filename)[1].lower()])
+    stream = None
+    pts = frame_pts(sequence.timestamps[indices])
+    k = 0
+    try:
+        for images in pool.imap(_decode_batch, batches(indices, batch_size)):
+            for image in images:
+                if stream is None:
+                    height, width = image.shape[:2]
+                    stream = container.add_stream(options["codec"], rate=int(round(sequence.frame_rate or 30)))
+                    stream.width = width - width % 2  # yuv420p 要求宽高为偶数
+                    stream.height = height - height % 2
+                    stream.pix_fmt = "yuv420p"
+                    stream.time_base = PTS_TIME_BASE
+                    stream.codec_context.time_base = PTS_TIME_BASE
+                    stream.options = {"crf": str(options["crf"]), "preset": options["preset"]}
+                frame = av.VideoFrame.from_ndarray(image[:stream.height, :stream.width], format="bgr24")
+                frame.pts = int(pts[k])
+                frame.time_base = PTS_TIME_BASE
+                k += 1
+                for packet in stream.encode(frame):
+                    container.mux(packet)
+            progress.update(len(images))
+        if stream is not None:
+            for packet in stream.encode():
+                container.mux(packet)
+    finally:
+        container.close()
+    os.replace(tmp_filename, filename)
+
+
+def export_video(sequence: DeviceSequence, pool, options, batch_size, segment):
+    """segment > 0 时每 segment 帧一个文件 <name>_<起始帧号>.mp4，已存在的分段跳过"""
+    output = options["output"]
+    folder = os.path.dirname(os.path.abspath(output))
+    os.makedirs(folder, exist_ok=True)
+    total = len(sequence)
+    if segment > 0:
+        root, ext = os.path.splitext(output)
+        parts = [(range(start, min(start + segment, total)), f"{root}_{start:06d}{ext}")
+                 for start in range(0, total, segment)]
+    else:
+        parts = [(range(total), output)]
+    todo = [(indices, filename) for indices, filename in parts if not os.path.exists(filename)]
+    if len(todo) < len(parts):
+        print(f"[{sequence.device_name}] 跳过已导出的 {len(parts) - len(todo)} 个分段")
+    progress = Progress(sequence.device_name, sum(len(indices) for indices, _ in todo))
+    for indices, filename in todo:
+        encode_segment(sequence, pool, np.asarray(indices), filename, options, batch_size, progress)
+        print(f"[{sequence.device_name}] 已保存 {filename}")
+    progress.summary()
+
+
+def remux(sequence: DeviceSequence, output):
+    """MJPEG 帧原样作为数据包写入容器，每帧都是关键帧，只在取画面尺寸时解码第一帧"""
+    if sequence.codec != "mjpeg":
+        raise ValueError(f"[{sequence.device_name}] 编码为 {sequence.codec}，只有 MJPEG 能直接封装")
+    if os.path.exists(output):
+        print(f"[{sequence.device_name}] {output} 已存在，跳过")
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(output)) or ".", exist_ok=True)
+    height, width = sequence[0].shape[:2]
+    pts = frame_pts(sequence.timestamps)
+    tmp_filename = output + ".part"
+    container = av.open(tmp_filename, "w", format=VIDEO_FORMATS[os.path.splitext(output)[1].lower()])
+    progress = Progress(sequence.device_name, len(sequence))
+    nbytes = 0
+    try:
+        stream = container.add_stream("mjpeg", rate=int(round(sequence.frame_rate or 30)))
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuvj420p"
+        stream.time_base = PTS_TIME_BASE
+        stream.codec_context.time_base = PTS_TIME_BASE
+        for i in range(len(sequence)):
+            data = sequence.raw(i)
+            packet = av.Packet(bytes(data))
+            packet.stream = stream
+            packet.pts = packet.dts = int(pts[i])
+            packet.time_base = PTS_TIME_BASE
+            packet.is_keyframe = True
+            container.mux(packet)
+            nbytes += len(data)
+            progress.update(1)
+    finally:
+        container.close()
+    os.replace(tmp_filename, output)
+    progress.summary()
+    elapsed = max(time.time() - progress.start, 1e-6)
+    print(f"[{sequence.device_name}] 已保存 {output}，{nbytes / 1e6:.1f}MB，{nbytes / 1e6 / elapsed:.1f}MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制的摄像头/深度数据并行解码导出")
+    parser.add_argument("device", help="设备目录（save_floder/<device_name>）")
+    parser.add_argument("-o", "--output", required=True, help="图片输出目录，或视频文件名（.mp4/.mkv/.avi）")
+    parser.add_argument("--copy", action="store_true", help="MJPEG 不重新编码，直接封装进 .mkv/.avi")
+    parser.add_argument("--format", help="图片格式 jpg/png，默认 jpg，深度/红外等 16 位图默认 png；输出为视频文件名时忽略")
+    parser.add_argument("--quality", type=int, default=95, help="jpg 质量")
+    parser.add_argument("--crop", type=int, nargs=4, metavar=("X", "Y", "W", "H"), help="裁剪区域")
+    parser.add_argument("--resize", type=int, nargs=2, metavar=("W", "H"), help="缩放到指定尺寸")
+    parser.add_argument("--orient", action="store_true", help="按元数据翻转（Orbbec 深度图）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="解码进程数")
+    parser.add_argument("--batch", type=int, default=32, help="每个任务的帧数")
+    parser.add_argument("--codec", default="libx264", help="视频编码器")
+    parser.add_argument("--crf", type=int, default=20)
+    parser.add_argument("--preset", default="veryfast")
+    parser.add_argument("--segment", type=int, default=0, help="视频每段帧数，0 为单个文件（中断后需重新导出）")
+    args = parser.parse_args()
+
+    sequence = DeviceSequence(args.device, orient=args.orient)
+    if not len(sequence):
+        print(f"{args.device} 下没有找到录制数据")
+        return
+    if not sequence.is_video:
+        print(f"[{sequence.device_name}] 不是图像类设备，无法导出")
+        return
+    video = os.path.splitext(args.output)[1].lower() in VIDEO_FORMATS
+    if video and av is None:
+        print("导出视频需要安装 PyAV（pip install av）")
+        return
+    if args.copy:
+        if not video:
+            print("--copy 需要输出视频文件名（.mkv/.avi）")
+            return
+        remux(sequence, args.output)
+        return
+    high_depth = sequence[0].dtype != np.uint8
+    ext = (args.format or ("png" if high_depth else "jpg")).lower().lstrip(".")
+    if high_depth and not video and ext not in HIGH_DEPTH_FORMATS:
+        print(f"[{sequence.device_name}] {ext} 只能保存 8 位图像，每帧按最小/最大值归一化后保存，保留原始数值请用 --format png")
+    params = [cv2.IMWRITE_JPEG_QUALITY, args.quality] if ext in ("jpg", "jpeg") else []
+    options = dict(output=args.output, format=ext, params=params, crop=args.crop, resize=args.resize,
+                   orient=args.orient, codec=args.codec, crf=args.crf, preset=args.preset)
+    print(f"[{sequence.device_name}] {len(sequence)}帧，编码 {sequence.codec}，{args.workers}个解码进程")
+
+    with Pool(args.workers, initializer=_init_worker, initargs=(args.device, options)) as pool:
+        if video:
+            export_video(sequence, pool, options, args.batch, args.segment)
+        else:
+            export_images(sequence, pool, options, args.batch)
+
+
+if __name__ == "__main__":
+    main()
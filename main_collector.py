@@ -17,6 +17,7 @@ from BaseDevice.UwbDevice import UwbDevice
 from BaseDevice.MilliWaveDevice import MilliWaveDevice
 from BaseDevice.OpencvDevice import OpencvDevice
 from BaseDevice.FFmpegDevice import FFmpegDevice
+from BaseDevice.ProcessDevice import ProcessDevice
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout,
@@ -27,23 +28,32 @@ from PyQt5.QtGui import QImage, QPixmap
 from pygrabber.dshow_graph import FilterGraph
 
 QUALITY = 10
+MULTI_PROCESS = False  # 多进程采集模式：每个设备在独立子进程中采集和录制，GUI进程只保留代理
+PREVIEW_INTERVAL = 1.0  # 预览刷新间隔（秒），设备侧按此间隔准备预览帧
+# 设备时间戳偏移（秒）：设备名 -> 加到该设备时间戳上的值，已知传输延迟 d 时填 -d，写入元数据供离线对齐参考
+CLOCK_OFFSETS = {}
+# output_codec：copy 原样保存摄像头的 MJPEG 数据包（默认，不占 CPU）；
+# mjpeg 按 quality 重新编码（摄像头原生流无法正常解码时使用）；h264/hevc 实时压缩（存储小，占 CPU）
 camera_params={
     "Logitech StreamCam": {
         "frame_size":(1080, 1920, 3),
         "frame_rate": 30,
         "encode_type":"mjpeg",
+        "output_codec": "copy",
         "quality": QUALITY,
     },
     "USB Camera":{
         "frame_size":(1080, 1920, 3),
         "frame_rate": 30,
         "encode_type":"mjpeg",
+        "output_codec": "copy",
         "quality": QUALITY,
     },
     "HD USB Camera":{
         "frame_size":(1080, 1920, 3),
         "frame_rate": 120,
         "encode_type":"mjpeg",
+        "output_codec": "copy",
         "quality": QUALITY,
     },
     "HD Pro Webcam C920":{
@@ -52,12 +62,14 @@ camera_params={
         "frame_size":(1080, 1920, 3),
         "frame_rate": 30,
         "encode_type":"mjpeg",
+        "output_codec": "copy",
         "quality": QUALITY,
     },
     "LRCP  USB2.0":{
         "frame_size":(1080, 1920, 3),
         "frame_rate": 30,
         "encode_type":"mjpeg",
+        "output_codec": "copy",
         "quality": QUALITY,
     }
 }
@@ -74,6 +86,9 @@ class MainWindow(QWidget):
             os.makedirs(data_dir)
         self.save_dir = data_dir
         print('开始初始化')
+        BaseDevice.preview_interval = PREVIEW_INTERVAL
+        for name, offset in CLOCK_OFFSETS.items():
+            BaseDevice.clock.set_offset(name, offset)
         self.init_devices()
         BaseDevice.start_devices()
         print("所有设备初始化完成")
@@ -95,7 +110,7 @@ class MainWindow(QWidget):
         # 定时器刷新摄像头画面
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frames)
-        self.timer.start(5000)  # 约10fps刷新
+        self.timer.start(int(PREVIEW_INTERVAL * 1000))
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -229,34 +244,17 @@ class MainWindow(QWidget):
             BaseDevice.save_dir = dir_path
 
     def update_frames(self):
-        frames = [device.get_current_data() for device in self.device_list]
-        try:
-            for label_name, frame in zip(self.labels.keys(), frames):
-                if frame is not None:
-                    if label_name in ["orbbec_depth_camera","uwb","milliwave"]:
-                        self.show_frame_gray(self.labels[label_name], frame)
-                    else:
-
-                        self.show_frame(self.labels[label_name], frame)
-        except Exception as e:
-            pass
+        # 预览帧已由设备侧缩放到 QLabel 大小并转为 RGB，这里只包装显示
+        for device_name, label in self.labels.items():
+            frame = self.devices[device_name].get_preview()
+            if frame is not None:
+                self.show_frame(label, frame)
 
     def show_frame(self, label, frame):
-        # BGR转RGB
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
+        h, w, ch = frame.shape
         bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image).scaled(label.width(), label.height(), Qt.KeepAspectRatio)
-        label.setPixmap(pixmap)
-
-    def show_frame_gray(self, label, frame):
-        h, w = frame.shape
-
-        bytes_per_line = w
-        qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_Grayscale8)
-        pixmap = QPixmap.fromImage(qt_image).scaled(label.width(), label.height(), Qt.KeepAspectRatio)
-        label.setPixmap(pixmap)
+        qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+        label.setPixmap(QPixmap.fromImage(qt_image))
 
     def start_record(self):
         for checkbox in self.checkboxes.values():
@@ -343,7 +341,9 @@ class MainWindow(QWidget):
                 } for i, camera_name in enumerate(camera_devices_list) if camera_name in camera_params.keys() 
             ],
             OrbbecDevice: [
-               {"device_name":"orbbec_depth_camera", "frame_type":"depth", "frame_rate":30},
+               # streams 可选 depth/ir/color，同一设备对象同时采集；部分 Astra 型号不能同时采集 depth 和 ir，
+               # 需要红外时按型号改为 ["depth", "ir"]
+               {"device_name":"orbbec_depth_camera", "streams":["depth"], "frame_rate":30},
             ],
             PPGDevice: [
                {"device_name":"ppg", "port":"COM4", "frame_rate":1000}  
@@ -366,7 +366,10 @@ class MainWindow(QWidget):
 
         for device_class, device_configs in devices_configs.items():
             for device_config in device_configs:
-                device_class(**device_config)
+                if MULTI_PROCESS:
+                    ProcessDevice(device_class, **device_config)
+                else:
+                    device_class(**device_config)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+import numpy as np
+import pytest
+from BaseDevice.BaseDevice import BaseDevice
+from BaseDevice.util.SessionReader import DeviceSequence
+
+
+class ArrayDevice(BaseDevice):
+    """只用于测试录制写入的数值型设备"""
+    frame_shape = (64, 64, 3)
+
+    def __init__(self, device_name, frame_rate):
+        super().__init__(device_name, frame_rate)
+        self.one_frame = np.zeros(self.frame_shape, dtype=np.uint8)
+
+
+@pytest.fixture
+def device(tmp_path, monkeypatch):
+    monkeypatch.setattr(BaseDevice, "save_floder", str(tmp_path), raising=False)
+    monkeypatch.setattr(BaseDevice, "meta_data", {}, raising=False)
+    monkeypatch.setattr(BaseDevice, "devices", {})
+    return ArrayDevice("array0", frame_rate=1)
+
+
+def test_memory_budget_spills_chunk(device, monkeypatch):
+    # 每块 5 帧（chunk_seconds * frame_rate + 1），预算只够一块，第二块起溢出到临时文件
+    block_nbytes = 5 * int(np.prod(ArrayDevice.frame_shape))
+    monkeypatch.setattr(ArrayDevice, "chunk_seconds", 4)
+    monkeypatch.setattr(ArrayDevice, "memory_budget", block_nbytes)
+    frames = np.random.randint(0, 255, (12,) + ArrayDevice.frame_shape, dtype=np.uint8)
+    timestamps = np.arange(12) * 0.25
+
+    writer = device.open_writer()
+    writer.extend(frames, timestamps)
+    assert writer.memory_budget == block_nbytes
+    assert writer.frames.memory_nbytes == block_nbytes
+    assert len(writer.frames.spill_files) == 2
+    writer.close()
+
+    folder = writer.folder
+    sequence = DeviceSequence(folder)
+    assert np.array_equal(sequence.array(), frames)
+    assert np.allclose(sequence.timestamps, timestamps)
+    assert not [name for name in os.listdir(folder) if name.endswith(".spill")]
+
+
+def test_preview_errors_counted(device, monkeypatch, capsys):
+    def broken():
+        raise ValueError("bad frame")
+    monkeypatch.setattr(device, "get_current_data", broken)
+    device.preview_interval = 0.01
+    device.running = True
+    thread = threading.Thread(target=device._preview_loop, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+    device.running = False
+    thread.join()
+    assert device.preview_errors > 1
+    out = capsys.readouterr().out
+    assert out.count("预览帧获取失败") == 1
+    assert "bad frame" in out
+
+
+def test_prepare_record_before_first_frame(device):
+    """PPG/UWB 等设备在收到第一帧之前 one_frame 为 None，开始录制不应出错"""
+    device.one_frame = None
+    device.frame_count = 3
+    device.prepare_record()
+    assert device.frame_count == 0
+    assert device.writer is None
+
+
+def test_buffer_typed_on_first_batch(device):
+    """录制开始后才收到第一批采样时，按帧形状重建缓冲，而不是写入 object 缓冲"""
+    device.one_frame = None
+    device.buffer_size = 10
+    device.prepare_record()
+    assert device.buffer.shape is None
+    frames = np.arange(12, dtype=np.int16).reshape(4, 3)
+    device.one_frame = frames[0].copy()
+    device.put_batch_to_buffer(frames, np.arange(4) * 0.001)
+    assert device.buffer.shape == (3,)
+    got, timestamps, _ = device.buffer.get_batch(timeout=0)
+    assert got.dtype == np.int16
+    assert np.array_equal(got, frames)
@@ -0,0 +1,49 @@
+import os
+import sys
+import cv2
+import numpy as np
+import pytest
+import export_video
+from BaseDevice.util.DepthCodec import DepthCodec
+from BaseDevice.util.EncoderPool import EncoderPool
+from BaseDevice.util.FrameContainer import FrameContainerWriter
+
+
+@pytest.fixture
+def depth_dir(tmp_path):
+    """Orbbec 深度流：16 位深度图经 DepthCodec 写入帧容器"""
+    frames = np.random.randint(300, 4000, (3, 24, 32), dtype=np.uint16)
+    encoder = DepthCodec("png")
+    folder = str(tmp_path / "depth")
+    writer = FrameContainerWriter(folder, "depth", 30, extra_fields=encoder.fields, codec=encoder.codec,
+                                  codec_info=encoder.codec_info(frames[0]))
+    pool = EncoderPool(writer, encoder, workers=1)
+    pool.extend(frames, np.arange(3) / 30)
+    pool.close()
+    return folder, frames
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["export_video.py"] + list(argv) + ["--workers", "1"])
+    export_video.main()
+
+
+def test_depth_exports_16bit_png_by_default(depth_dir, tmp_path, monkeypatch):
+    folder, frames = depth_dir
+    output = str(tmp_path / "out")
+    run(monkeypatch, folder, "-o", output)
+    assert sorted(os.listdir(output)) == ["000000.png", "000001.png", "000002.png"]
+    image = cv2.imread(os.path.join(output, "000001.png"), cv2.IMREAD_UNCHANGED)
+    assert image.dtype == np.uint16
+    assert np.array_equal(image, frames[1])
+
+
+def test_depth_jpg_is_normalized(depth_dir, tmp_path, monkeypatch):
+    folder, frames = depth_dir
+    output = str(tmp_path / "out")
+    run(monkeypatch, folder, "-o", output, "--format", "jpg")
+    image = cv2.imread(os.path.join(output, "000000.jpg"), cv2.IMREAD_GRAYSCALE)
+    # 直接写 16 位图时几乎全部像素饱和为 255
+    assert (image == 255).mean() < 0.1
+    expected = cv2.normalize(frames[0], None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    assert np.abs(image.astype(int) - expected).mean() < 8
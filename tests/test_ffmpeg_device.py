@@ -0,0 +1,49 @@
+import pytest
+from BaseDevice.FFmpegDevice import FFmpegDevice
+
+
+def make_device(output_codec, **kwargs):
+    return FFmpegDevice(device_name=f"test_{output_codec}", camera_name="test", frame_size=(1080, 1920, 3),
+                        frame_rate=30, output_codec=output_codec, **kwargs)
+
+
+def output_args(option_list):
+    """-i 之后的输出参数"""
+    return option_list[option_list.index('-i') + 2:]
+
+
+@pytest.mark.parametrize("output_codec", list(FFmpegDevice.LIVE_CODECS))
+def test_live_command_line(output_codec):
+    args = output_args(make_device(output_codec, gop=15).option_list)
+    assert args[-3:] == ['-f', 'nut', '-']
+    # 除最后的输出目标外，参数都是 -选项 值 成对出现
+    options = args[:-1]
+    assert len(options) % 2 == 0
+    for name, value in zip(options[::2], options[1::2]):
+        assert name.startswith('-') and not value.startswith('-'), (name, value)
+    pairs = dict(zip(options[::2], options[1::2]))
+    assert pairs['-g'] == '15'
+    assert pairs['-bsf:v'] == 'dump_extra'
+    if output_codec == "hevc":
+        assert pairs['-c:v'] == 'libx265'
+        assert 'keyint=15' in pairs['-x265-params']
+    else:
+        assert pairs['-c:v'] == 'libx264'
+
+
+def test_mjpeg_command_lines():
+    assert output_args(make_device("copy").option_list) == ['-c:v', 'copy', '-f', 'mjpeg', '-']
+    assert output_args(make_device("mjpeg", quality=5).option_list) == ['-f', 'mjpeg', '-q:v', '5', '-']
+
+
+@pytest.mark.parametrize("frame_size, scale", [((1080, 1920), 2), ((720, 1280), 2), ((480, 640), 1), ((2160, 3840), 4)])
+def test_auto_preview_scale_not_below_preview_size(frame_size, scale):
+    """缩小解码的尺寸不小于预览通道中的显示尺寸，预览只缩小不放大"""
+    h, w = frame_size
+    assert FFmpegDevice.auto_preview_scale(w, h) == scale
+
+
+def test_default_preview_scale():
+    device = make_device("copy")
+    assert device.preview_scale == 2
+    assert make_device("copy", preview_scale=4).preview_scale == 4
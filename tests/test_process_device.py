@@ -0,0 +1,104 @@
+import os
+import time
+import numpy as np
+import pytest
+from BaseDevice.BaseDevice import BaseDevice
+from BaseDevice.ProcessDevice import ProcessDevice
+from BaseDevice.util.SessionReader import DeviceSequence
+
+
+class CounterDevice(BaseDevice):
+    """按帧率产生帧号的测试设备，帧内容为 [设备编号, 帧号]"""
+
+    def __init__(self, device_name, frame_rate, device_id):
+        super().__init__(device_name, frame_rate)
+        self.device_id = device_id
+        self.one_frame = np.zeros(2, dtype=np.int64)
+
+    def _collect_loop(self):
+        i = 0
+        while self.running:
+            if BaseDevice.recording and self.allow_record:
+                self.put_data_to_buffer((np.array([self.device_id, i]), self.clock.now(self.device_name)))
+            i += 1
+            time.sleep(1 / self.frame_rate)
+
+    def get_current_data(self):
+        return None
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(BaseDevice, "devices", {})
+    monkeypatch.setattr(BaseDevice, "recording", False)
+    monkeypatch.setattr(BaseDevice, "save_floder", str(tmp_path), raising=False)
+    monkeypatch.setattr(BaseDevice, "meta_data", {}, raising=False)
+    return tmp_path
+
+
+def test_worker_records_only_its_device(session):
+    proxies = [ProcessDevice(CounterDevice, device_name=f"counter{k}", frame_rate=50, device_id=k)
+               for k in range(2)]
+    BaseDevice.start_devices()
+    try:
+        BaseDevice.start_record()
+        time.sleep(0.5)
+        BaseDevice.stop_record()
+        for proxy in proxies:
+            proxy._save_data_all()
+    finally:
+        BaseDevice.stop_all()
+    for k, proxy in enumerate(proxies):
+        assert not proxy.process.is_alive()
+        frames = DeviceSequence(str(session / proxy.device_name)).array()
+        assert len(frames) > 5
+        assert (frames[:, 0] == k).all()
+
+
+class BrokenRecordDevice(CounterDevice):
+    """开始录制时出错的设备"""
+
+    def prepare_record(self):
+        raise RuntimeError("no sample yet")
+
+
+class ExitingDevice(CounterDevice):
+    """开始录制时子进程直接退出"""
+
+    def prepare_record(self):
+        os._exit(3)
+
+
+def test_worker_reports_command_errors(session, capsys):
+    proxy = ProcessDevice(BrokenRecordDevice, device_name="broken", frame_rate=50, device_id=0)
+    BaseDevice.start_devices()
+    try:
+        BaseDevice.start_record()
+        time.sleep(0.2)
+        BaseDevice.stop_record()
+        proxy._save_data_all()
+        assert proxy.process.is_alive()
+    finally:
+        BaseDevice.stop_all()
+    out = capsys.readouterr().out
+    assert "start_record 失败" in out and "no sample yet" in out
+
+
+def test_save_returns_when_worker_died(session, capsys):
+    proxy = ProcessDevice(ExitingDevice, device_name="exiting", frame_rate=50, device_id=0)
+    proxy.POLL_INTERVAL = 0.05
+    BaseDevice.start_devices()
+    try:
+        BaseDevice.start_record()
+        time.sleep(0.2)
+        BaseDevice.stop_record()
+        start = time.time()
+        proxy._save_data_all()
+        assert time.time() - start < 2
+    finally:
+        BaseDevice.stop_all()
+    assert proxy.process.exitcode == 3
+    assert "数据保存失败" in capsys.readouterr().out
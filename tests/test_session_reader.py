@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+from BaseDevice.util.SessionReader import DeviceSequence, SessionReader
+
+
+def make_jpegs(n, size=(48, 64)):
+    images = []
+    for i in range(n):
+        image = np.zeros(size + (3,), dtype=np.uint8)
+        image[:, :size[1] // 2] = 40 + i * 10
+        images.append(image)
+    return images, [cv2.imencode(".jpg", image)[1].tobytes() for image in images]
+
+
+@pytest.mark.parametrize("save", [np.savez, np.savez_compressed])
+def test_legacy_bytes_npz(tmp_path, save):
+    """早期 FFmpegDevice/VideoDevice 的 npz：帧为 |S 字节串，带 frame_lens 和 timestamp 键"""
+    images, jpegs = make_jpegs(5)
+    device_dir = tmp_path / "camera0"
+    device_dir.mkdir()
+    save(str(device_dir / "0.0f30c5.npz"), frames=np.array(jpegs), frame_lens=np.array([len(j) for j in jpegs]),
+         timestamp=np.arange(5) / 30, frame_rate=30)
+
+    sequence = SessionReader(str(tmp_path))["camera0"]
+    assert len(sequence) == 5
+    assert sequence.is_video
+    for i in range(5):
+        assert bytes(sequence.raw(i)) == jpegs[i]
+        assert np.abs(sequence[i].astype(int) - images[i]).max() <= 8
+    assert sequence.index_at(2.1 / 30) == 2
+
+
+def test_legacy_padded_npz(tmp_path):
+    """早期 OpencvDevice 的 npz：JPEG 补齐到相同长度的 uint8 数组"""
+    images, jpegs = make_jpegs(3)
+    frames = np.zeros((3, max(len(j) for j in jpegs)), dtype=np.uint8)
+    for i, jpeg in enumerate(jpegs):
+        frames[i, :len(jpeg)] = np.frombuffer(jpeg, dtype=np.uint8)
+    np.savez(str(tmp_path / "0.0f30c3.npz"), frames=frames, frame_lens=np.array([len(j) for j in jpegs]),
+             timestamp=np.arange(3) / 30, frame_rate=30)
+
+    sequence = DeviceSequence(str(tmp_path))
+    assert bytes(sequence.raw(1)) == jpegs[1]
+    assert sequence[1].shape == images[1].shape
+
+
+def test_legacy_bytes_npz_remux(tmp_path):
+    av = pytest.importorskip("av")
+    from export_video import remux
+    _, jpegs = make_jpegs(4)
+    device_dir = tmp_path / "camera0"
+    device_dir.mkdir()
+    np.savez(str(device_dir / "0.0f30c4.npz"), frames=np.array(jpegs), frame_lens=np.array([len(j) for j in jpegs]),
+             timestamp=np.arange(4) / 30, frame_rate=30)
+
+    output = str(tmp_path / "camera0.mkv")
+    remux(DeviceSequence(str(device_dir)), output)
+    with av.open(output) as container:
+        packets = [bytes(p) for p in container.demux(video=0) if p.size]
+    assert packets == jpegs
@@ -0,0 +1,34 @@
+import numpy as np
+from BaseDevice.util.SessionClock import SessionClock
+from BaseDevice.util.TimeAlign import load_timeline
+
+
+def test_clock_offset_per_device():
+    clock = SessionClock()
+    clock.set_offset("uwb", -0.05)
+    t0 = clock.now()
+    t1 = clock.now("uwb")
+    t2 = clock.now()
+    assert t0 - 0.05 <= t1 <= t2 - 0.05
+    assert clock.now("ppg") >= t2
+
+    other = SessionClock()
+    other.load(clock.state())
+    assert other.offsets == {"uwb": -0.05}
+
+
+def test_timeline_reads_recorded_offset(tmp_path):
+    """元数据中的偏移已包含在时间戳里，fit 不再重复扣除"""
+    clock = SessionClock()
+    clock.set_offset("uwb", -0.05)
+    timestamps = 100.0 + np.arange(50) / 20
+    device_dir = tmp_path / "uwb"
+    device_dir.mkdir()
+    np.savez(str(device_dir / "100.000000f50.npz"), frames=np.zeros((50, 3), dtype=np.float32),
+             timestamps=timestamps, frame_rate=20, device_name="uwb",
+             meta_info=np.array(dict(clock=clock.state()), dtype=object))
+
+    timeline = load_timeline(str(device_dir)).fit()
+    assert timeline.clock_offset == -0.05
+    assert timeline.report()["clock_offset"] == -0.05
+    assert np.allclose(timeline.corrected, timestamps)